@@ -2,18 +2,71 @@
 """click_loguru -- Setup loguru logging with stderr and file with click."""
 
 # standard library imports
+import contextvars
 import functools
 import sys
-from datetime import datetime
+import threading
 from pathlib import Path
+from time import localtime
 from time import process_time
+from time import strftime
+from time import time
 
 # third-party imports
-import attr
+from click import BadParameter
+from click import Choice
+from click import IntRange
 from click import get_current_context as cur_ctx
 from click import option
+from click.exceptions import Exit
 from loguru import logger
-from memory_profiler import memory_usage
+
+# module imports
+from .allocations import DEFAULT_N_SITES
+from .allocations import AllocationTracer
+from .filters import DEFAULT_BURST
+from .filters import DEFAULT_EXEMPT_LEVEL
+from .filters import ModuleLevelFilter
+from .filters import RateLimitFilter
+from .filters import chain_filters
+from .heartbeat import Heartbeat
+from .history import HISTORY_SUFFIX
+from .history import RunHistory
+from .logindex import LogIndex
+from .memory import DEFAULT_SAMPLE_INTERVAL
+from .memory import MEGABYTE
+from .memory import MemorySampler
+from .memory import format_bytes
+from .metrics import METRICS_SUFFIX
+from .metrics import format_metrics
+from .metrics import write_metrics
+from .multiproc import WorkerLogging
+from .profiling import DEFAULT_N_FUNCTIONS
+from .profiling import DEFAULT_PROFILE_INTERVAL
+from .profiling import PROFILE_MODES
+from .profiling import make_profiler
+from .profiling import profile_summary
+from .profiling import write_collapsed
+from .profiling import write_stats
+from .resources import format_usage
+from .resources import resource_usage
+from .resources import usage_delta
+from .sinks import DEFAULT_FLUSH_INTERVAL
+from .sinks import DEFAULT_QUEUE_SIZE
+from .sinks import LOGFILE_FORMATS
+from .sinks import AsyncFileSink
+from .sinks import BufferedFileSink
+from .sinks import CompressedFileSink
+from .sinks import JsonFormatter
+from .sinks import JsonSink
+from .sinks import RingBufferSink
+from .sinks import open_logfile
+from .timeline import MemoryTimeline
+from .timers import HotTimer
+from .timers import PhaseTimer
+from .timers import TimerTree
+from .timers import format_seconds
+from .timers import hot_timer_report
 
 # global constants
 __version__ = "1.3.5"
@@ -21,25 +74,125 @@ __all__ = ["ClickLoguru"]
 DEFAULT_STDERR_LOG_LEVEL = "INFO"
 DEFAULT_FILE_LOG_LEVEL = "DEBUG"
 NO_LEVEL_BELOW = 30  # Don't print level for messages below this level
-SKIP_FIELDS = -7
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# suffixes of files that are pruned along with their log files
+LOG_SUFFIXES = (".log", ".log.gz", ".pstats", ".collapsed", ".memtl")
+
+
+def _synchronous(user_func):
+    """Return a function that runs a coroutine function to completion.
+
+    Other functions are returned unchanged.  The event loop is run inside
+    the returned function, so decorators wrapping it time and measure the
+    whole run of the loop.  The returned function, and any wrapper made
+    with ``functools.wraps``, has a true ``runs_event_loop`` attribute.
+    """
+    import inspect
+
+    if not inspect.iscoroutinefunction(user_func):
+        return user_func
+
+    @functools.wraps(user_func)
+    def runner(*args, **kwargs):
+        import asyncio
+
+        return asyncio.run(user_func(*args, **kwargs))
+
+    runner.runs_event_loop = True
+    return runner
+
+
+def _phase_owner():
+    """Return the running asyncio task, or else the current thread's id."""
+    asyncio = sys.modules.get("asyncio")  # no tasks if it isn't imported
+    if asyncio is not None:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # no running event loop in this thread
+            task = None
+        if task is not None:
+            return task
+    return threading.get_ident()
+
+
+def _exit_status(error):
+    """Return the process exit status of a click Exit or a SystemExit."""
+    if isinstance(error, Exit):
+        return error.exit_code
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    return 1  # sys.exit with a message
+
+
+def _side_path(logfile_path, suffix):
+    """Return the path of a file kept next to a log file."""
+    name = logfile_path.name
+    for log_suffix in (".log.gz", ".log"):
+        if name.endswith(log_suffix):
+            name = name[: -len(log_suffix)]
+            break
+    return logfile_path.with_name(name + suffix)
 
 
 class ClickLoguru:
     """Creates decorators for use with click to control loguru logging ."""
 
-    @attr.s(auto_attribs=True)
     class LogState:
         """Click context object for verbosity, quiet, and logfile info."""
 
-        verbose: bool = False
-        quiet: bool = False
-        logfile: bool = True
-        profile_mem: bool = True
-        logfile_path: Path = None
-        logfile_handler_id: int = None
-        subcommand: str = None
-        user_options: attr.s = {}
-        max_mem: int = 0
+        def __init__(
+            self,
+            verbose=False,
+            quiet=False,
+            logfile=True,
+            profile_mem=True,
+            profile=None,
+            trace_alloc=None,
+            logfile_path=None,
+            logfile_handler_id=None,
+            subcommand=None,
+            user_options=None,
+            module_levels=None,
+            max_mem=0,
+            peak_rss=None,
+            timings=None,
+            hot_timings=None,
+            usage_counters=None,
+        ):
+            """Set default state."""
+            self.verbose = verbose
+            self.quiet = quiet
+            self.logfile = logfile
+            self.profile_mem = profile_mem
+            self.profile = profile
+            self.trace_alloc = trace_alloc
+            self.logfile_path = logfile_path
+            self.logfile_handler_id = logfile_handler_id
+            self.subcommand = subcommand
+            if user_options is None:
+                user_options = {}
+            self.user_options = user_options
+            if module_levels is None:
+                module_levels = {}
+            self.module_levels = module_levels
+            self.max_mem = max_mem
+            self.peak_rss = peak_rss
+            self.timings = timings
+            self.hot_timings = hot_timings
+            self.usage_counters = usage_counters
+
+        def __repr__(self):
+            """Show all state fields."""
+            fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+            return f"{self.__class__.__qualname__}({fields})"
+
+        def __eq__(self, other):
+            """Compare all state fields."""
+            if other.__class__ is not self.__class__:
+                return NotImplemented
+            return vars(self) == vars(other)
 
     def __init__(
         self,
@@ -51,6 +204,26 @@ class ClickLoguru:
         file_log_level=DEFAULT_FILE_LOG_LEVEL,
         stderr_log_level=DEFAULT_STDERR_LOG_LEVEL,
         timer_log_level="debug",
+        async_logfile=False,
+        async_queue_size=DEFAULT_QUEUE_SIZE,
+        async_overflow="block",
+        memory_sample_interval=DEFAULT_SAMPLE_INTERVAL,
+        memory_timeline=False,
+        profile_interval=DEFAULT_PROFILE_INTERVAL,
+        logfile_format="text",
+        compress_logfile=False,
+        rate_limit=None,
+        rate_limit_burst=DEFAULT_BURST,
+        rate_limit_exempt_level=DEFAULT_EXEMPT_LEVEL,
+        dedup_messages=False,
+        ring_buffer_size=None,
+        metrics_dir=None,
+        logfile_buffer_size=None,
+        logfile_flush_interval=DEFAULT_FLUSH_INTERVAL,
+        run_history=False,
+        heartbeat_interval=None,
+        stall_timeout=None,
+        stall_dump_stacks=False,
     ):
         """Initialize logging setup info."""
         self._name = name
@@ -60,10 +233,46 @@ class ClickLoguru:
         self._file_log_level = file_log_level
         self._stderr_log_level = stderr_log_level
         self.timer_log_level = timer_log_level.upper()
+        self._async_logfile = async_logfile
+        self._async_queue_size = async_queue_size
+        self._async_overflow = async_overflow
+        self._memory_sample_interval = memory_sample_interval
+        self._memory_timeline = memory_timeline
+        self._profile_interval = profile_interval
+        if logfile_format not in LOGFILE_FORMATS:
+            raise ValueError(
+                f"logfile_format must be one of {LOGFILE_FORMATS}"
+            )
+        self._logfile_format = logfile_format
+        self._compress_logfile = compress_logfile
+        self._rate_limit = rate_limit
+        self._rate_limit_burst = rate_limit_burst
+        self._rate_limit_exempt_level = rate_limit_exempt_level
+        self._dedup_messages = dedup_messages
+        self._ring_buffer_size = ring_buffer_size
+        self._metrics_dir = metrics_dir
+        self._logfile_buffer_size = logfile_buffer_size
+        self._logfile_flush_interval = logfile_flush_interval
+        self._run_history = run_history
+        self._heartbeat_interval = heartbeat_interval
+        self._stall_timeout = stall_timeout
+        self._stall_dump_stacks = stall_dump_stacks
         self.start_times = {
-            "Total": {"wall": datetime.now(), "process": process_time()}
+            "Total": {"wall": time(), "process": process_time()}
         }
-        self.phase = None
+        # (phase name, timer token, start dict, owner) of a thread or task
+        self._phase_state = contextvars.ContextVar(
+            f"phase_{id(self)}", default=None
+        )
+        self._timer_tree = TimerTree()
+        # current phases of all threads and tasks, oldest first
+        self._running_phases = {}
+        self._running_lock = threading.Lock()
+        self._hot_timers = {}
+        self._sampler = None
+        self._usage_start = None
+        self._tracer = None
+        self._tracer_sites = DEFAULT_N_SITES
         if stderr_format_func is None:
 
             def format_func(msgdict):
@@ -150,92 +359,262 @@ class ClickLoguru:
             callback=callback,
         )(user_func)
 
+    def _profile_option(self, user_func):
+        """Define CPU profiling option."""
+
+        def callback(ctx, unused_param, value):
+            """Set profile state."""
+            state = ctx.ensure_object(self.LogState)
+            state.profile = value
+            return value
+
+        return option(
+            "--profile",
+            type=Choice(PROFILE_MODES),
+            default=None,
+            expose_value=False,
+            help="Profile CPU use, deterministically or by sampling.",
+            callback=callback,
+        )(user_func)
+
+    def _trace_alloc_option(self, user_func):
+        """Define allocation tracing option."""
+
+        def callback(ctx, unused_param, value):
+            """Set trace_alloc state."""
+            state = ctx.ensure_object(self.LogState)
+            state.trace_alloc = value
+            return value
+
+        return option(
+            "--trace-alloc",
+            type=IntRange(min=1),
+            default=None,
+            metavar="FRAMES",
+            expose_value=False,
+            help="Trace allocations with tracemalloc, keeping FRAMES frames.",
+            callback=callback,
+        )(user_func)
+
+    def _log_level_option(self, user_func):
+        """Define per-module log level option."""
+
+        def callback(ctx, unused_param, value):
+            """Set module levels state."""
+            state = ctx.ensure_object(self.LogState)
+            for spec in value:
+                module, sep, level = spec.partition("=")
+                try:
+                    if not (sep and module):
+                        raise ValueError(spec)
+                    logger.level(level.upper())
+                except ValueError:
+                    raise BadParameter(
+                        f'"{spec}" is not of the form MODULE=LEVEL'
+                    ) from None
+                state.module_levels[module] = level.upper()
+            return value
+
+        return option(
+            "--log-level",
+            multiple=True,
+            metavar="MODULE=LEVEL",
+            expose_value=False,
+            help="Set log level for a module and its submodules.",
+            callback=callback,
+        )(user_func)
+
     def logging_options(self, user_func):
         """Set all logging options."""
         user_func = self._verbose_option(user_func)
         user_func = self._quiet_option(user_func)
         user_func = self._logfile_option(user_func)
         user_func = self._profile_mem_option(user_func)
+        user_func = self._profile_option(user_func)
+        user_func = self._trace_alloc_option(user_func)
+        user_func = self._log_level_option(user_func)
         return user_func
 
+    def _get_stderr_log_level(self, state):
+        """Get the verbose/quiet levels from context."""
+        if state.verbose:
+            return "DEBUG"
+        if state.quiet:
+            return "ERROR"
+        return self._stderr_log_level
+
+    def _module_level_filter(self, state, default_level):
+        """Return a filter for per-module levels, if any were set."""
+        if not state.module_levels:
+            return None
+        return ModuleLevelFilter(state.module_levels, default_level)
+
     def init_logger(self, log_dir_parent=None, logfile=True):
-        """Log to stderr and to logfile at different levels."""
+        """Log to stderr and to logfile at different levels.
+
+        For coroutine commands, the log file is written from a background
+        thread so that logging never waits on file I/O in the event loop.
+        """
 
         def decorator(user_func):
+            user_func = _synchronous(user_func)
+            runs_event_loop = getattr(user_func, "runs_event_loop", False)
+
             @functools.wraps(user_func)
             def wrapper(*args, **kwargs):
                 state = cur_ctx().find_object(self.LogState)
-                # get the verbose/quiet levels from context
-                if state.verbose:
-                    log_level = "DEBUG"
-                elif state.quiet:
-                    log_level = "ERROR"
-                else:
-                    log_level = self._stderr_log_level
+                log_level = self._get_stderr_log_level(state)
+                self._timer_tree.reset()
+                with self._running_lock:
+                    self._running_phases.clear()
+                for hot_timer in self._hot_timers.values():
+                    hot_timer.reset()
                 logger.remove()  # remove existing default logger
+                if self._rate_limit is not None or self._dedup_messages:
+                    log_filter = RateLimitFilter(
+                        rate=self._rate_limit,
+                        burst=self._rate_limit_burst,
+                        dedup=self._dedup_messages,
+                        exempt_level=self._rate_limit_exempt_level,
+                    )
+                else:
+                    log_filter = None
+                stderr_filter = self._module_level_filter(state, log_level)
+                if stderr_filter is not None:
+                    log_level = stderr_filter.min_level
                 logger.add(
-                    sys.stderr, level=log_level, format=self.stderr_format_func
+                    sys.stderr,
+                    level=log_level,
+                    format=self.stderr_format_func,
+                    filter=chain_filters(stderr_filter, log_filter),
                 )
+                ring_sink = None
+                subcommand = cur_ctx().invoked_subcommand
+                if subcommand is None:
+                    subcommand = state.subcommand
+                if subcommand is not None:
+                    logfile_prefix = f"{self._name}-{subcommand}"
+                else:
+                    logfile_prefix = f"{self._name}"
+                if log_dir_parent is not None:
+                    self._log_dir_parent = log_dir_parent
+                if self._log_dir_parent is None:
+                    log_dir_path = Path(".") / "logs"
+                else:
+                    log_dir_path = Path(self._log_dir_parent)
                 if logfile and state.logfile:  # start a log file
                     # If a subcommand was used, log to a file in the
                     # logs/ subdirectory with the subcommand in the file name.
-                    if log_dir_parent is not None:
-                        self._log_dir_parent = log_dir_parent
-                    if self._log_dir_parent is None:
-                        log_dir_path = Path(".") / "logs"
-                    else:
-                        log_dir_path = Path(self._log_dir_parent)
-                    subcommand = cur_ctx().invoked_subcommand
-                    if subcommand is None:
-                        subcommand = state.subcommand
-                    if subcommand is not None:
-                        logfile_prefix = f"{self._name}-{subcommand}"
-                    else:
-                        logfile_prefix = f"{self._name}"
-                    if log_dir_path.exists():
-                        log_numbers = [
-                            f.name[len(logfile_prefix) + 1 : -4]
-                            for f in log_dir_path.glob(
-                                logfile_prefix + "_*.log"
-                            )
-                        ]
-                        log_number_ints = sorted(
-                            [int(n) for n in log_numbers if n.isnumeric()]
-                        )
-                        if len(log_number_ints) > 0:
-                            log_number = log_number_ints[-1] + 1
-                            if (
-                                self._retention is not None
-                                and len(log_number_ints) > self._retention
-                            ):
-                                for remove in log_number_ints[
-                                    : len(log_number_ints) - self._retention
-                                ]:
-                                    (
-                                        log_dir_path
-                                        / f"{logfile_prefix}_{remove}.log"
-                                    ).unlink()
-                        else:
-                            log_number = 0
-                    else:
-                        log_number = 0
                     if self._retention == 0:
                         state.logfile_path = (
                             log_dir_path / f"{logfile_prefix}.log"
                         )
                     else:
-                        state.logfile_path = (
-                            log_dir_path / f"{logfile_prefix}_{log_number}.log"
+                        log_index = LogIndex(
+                            log_dir_path,
+                            logfile_prefix,
+                            self._retention,
+                            suffixes=LOG_SUFFIXES,
                         )
-                    state.logfile_handler_id = logger.add(
-                        str(state.logfile_path), level=self._file_log_level
+                        state.logfile_path = log_index.logfile_path(
+                            log_index.allocate()
+                        )
+                    file_filter = self._module_level_filter(
+                        state, self._file_log_level
                     )
+                    file_kwargs = {
+                        "level": self._file_log_level,
+                        "filter": chain_filters(file_filter, log_filter),
+                    }
+                    if file_filter is not None:
+                        file_kwargs["level"] = file_filter.min_level
+                    if self._compress_logfile:
+                        state.logfile_path = state.logfile_path.with_suffix(
+                            ".log.gz"
+                        )
+                    if self._async_logfile or runs_event_loop:
+                        sink = AsyncFileSink(
+                            state.logfile_path,
+                            queue_size=self._async_queue_size,
+                            overflow=self._async_overflow,
+                            compress=self._compress_logfile,
+                        )
+                        file_kwargs["colorize"] = False
+                    elif self._compress_logfile:
+                        sink = CompressedFileSink(state.logfile_path)
+                        file_kwargs["colorize"] = False
+                    elif self._logfile_buffer_size:
+                        sink = BufferedFileSink(
+                            state.logfile_path,
+                            buffer_size=self._logfile_buffer_size,
+                            flush_interval=self._logfile_flush_interval,
+                        )
+                        file_kwargs["colorize"] = False
+                    elif (
+                        self._ring_buffer_size
+                        or self._logfile_format == "json"
+                    ):
+                        sink = open_logfile(state.logfile_path, buffering=1)
+                    else:
+                        sink = str(state.logfile_path)
+                    if self._ring_buffer_size:
+                        sink = ring_sink = RingBufferSink(
+                            sink, self._ring_buffer_size
+                        )
+                        file_kwargs["colorize"] = False
+                    if self._logfile_format == "json":
+                        sink = JsonSink(
+                            sink,
+                            JsonFormatter(
+                                {"name": self._name, "subcommand": subcommand},
+                                get_phase=lambda: self.phase,
+                            ),
+                        )
+                        file_kwargs["format"] = "{message}"
+                        file_kwargs["colorize"] = False
+                    state.logfile_handler_id = logger.add(sink, **file_kwargs)
                 logger.debug(f'Command line: "{" ".join(sys.argv)}"')
                 logger.debug(f"{self._name} version {self._version}")
+                started = localtime(self.start_times["Total"]["wall"])
                 logger.debug(
-                    f"Run started at {str(self.start_times['Total']['wall'])[:SKIP_FIELDS]}"
+                    f"Run started at {strftime(TIMESTAMP_FORMAT, started)}"
                 )
-                return user_func(*args, **kwargs)
+                exit_status = 1
+                heartbeat = None
+                if self._heartbeat_interval or self._stall_timeout:
+                    heartbeat = Heartbeat(
+                        interval=self._heartbeat_interval,
+                        stall_timeout=self._stall_timeout,
+                        dump_stacks=self._stall_dump_stacks,
+                        level=self.timer_log_level,
+                        get_phase=self._latest_phase,
+                    ).start()
+                try:
+                    returnobj = user_func(*args, **kwargs)
+                    exit_status = 0
+                    return returnobj
+                except (Exit, SystemExit) as error:
+                    exit_status = _exit_status(error)
+                    if exit_status and ring_sink is not None:
+                        ring_sink.dump()
+                    raise
+                except Exception:
+                    if ring_sink is not None:
+                        ring_sink.dump()
+                    raise
+                finally:
+                    if heartbeat is not None:
+                        heartbeat.stop()
+                    if log_filter is not None:
+                        log_filter.flush()
+                    if self._metrics_dir is not None:
+                        self._write_metrics(
+                            state, subcommand, logfile_prefix, exit_status
+                        )
+                    if self._run_history:
+                        self._record_history(
+                            state, subcommand, log_dir_path, exit_status
+                        )
 
             return wrapper
 
@@ -245,12 +624,31 @@ class ClickLoguru:
         """Log the elapsed time for (sub)command."""
 
         def decorator(user_func):
+            user_func = _synchronous(user_func)
+
             @functools.wraps(user_func)
             def wrapper(*args, **kwargs):
                 returnobj = user_func(*args, **kwargs)
                 logger.log(
                     level.upper(), self._format_time("Total"),
                 )
+                if self._timer_tree.root.children:
+                    logger.log(
+                        level.upper(),
+                        "Timing summary:\n" + self._timer_tree.report(),
+                    )
+                hot_timers = [t for t in self._hot_timers.values() if t.count]
+                if hot_timers:
+                    logger.log(
+                        level.upper(),
+                        "Hot timer summary:\n" + hot_timer_report(hot_timers),
+                    )
+                state = cur_ctx().find_object(self.LogState)
+                if state is not None:
+                    state.timings = self._timer_tree.as_dict()
+                    state.hot_timings = {
+                        t.name: t.as_dict() for t in hot_timers
+                    }
                 return returnobj
 
             return wrapper
@@ -261,19 +659,29 @@ class ClickLoguru:
         """Log the peak memory use for (sub)command."""
 
         def decorator(user_func):
+            user_func = _synchronous(user_func)
+
             @functools.wraps(user_func)
             def wrapper(*args, **kwargs):
                 state = cur_ctx().find_object(self.LogState)
                 if state.profile_mem:
-                    max_mem, returnobj = memory_usage(
-                        (user_func, args, kwargs),
-                        retval=True,
-                        include_children=True,
-                        max_usage=True,
-                        multiprocess=True,
-                        max_iterations=1,
+                    if self._memory_timeline and state.logfile_path:
+                        timeline = MemoryTimeline(
+                            _side_path(state.logfile_path, ".memtl")
+                        )
+                    else:
+                        timeline = None
+                    sampler = MemorySampler(
+                        self._memory_sample_interval, timeline=timeline
                     )
-                    state.max_mem = int(max_mem)
+                    self._sampler = sampler
+                    try:
+                        with sampler:
+                            returnobj = user_func(*args, **kwargs)
+                    finally:
+                        self._sampler = None
+                    state.peak_rss = sampler.peak
+                    state.max_mem = int(sampler.peak / MEGABYTE)
                     logger.log(
                         level.upper(),
                         f"Peak total memory use = {state.max_mem} MB.",
@@ -286,10 +694,117 @@ class ClickLoguru:
 
         return decorator
 
+    def log_resource_usage(self, level="debug"):
+        """Log CPU, page-fault, context-switch, and I/O use of (sub)command.
+
+        While active, ``elapsed_time`` logs the same counters per phase.
+        """
+
+        def decorator(user_func):
+            user_func = _synchronous(user_func)
+
+            @functools.wraps(user_func)
+            def wrapper(*args, **kwargs):
+                start = self._usage_start = resource_usage()
+                try:
+                    returnobj = user_func(*args, **kwargs)
+                finally:
+                    self._usage_start = None
+                usage = usage_delta(start, resource_usage())
+                state = cur_ctx().find_object(self.LogState)
+                if state is not None:
+                    state.usage_counters = usage
+                logger.log(
+                    level.upper(), "Resource usage: " + format_usage(usage)
+                )
+                return returnobj
+
+            return wrapper
+
+        return decorator
+
+    def log_allocations(self, level="debug", n_sites=DEFAULT_N_SITES):
+        """Log the top allocation sites of (sub)command at its peak.
+
+        While active, ``elapsed_time`` logs the top sites at the end of
+        each phase and the largest changes over the phase.
+        """
+
+        def decorator(user_func):
+            user_func = _synchronous(user_func)
+
+            @functools.wraps(user_func)
+            def wrapper(*args, **kwargs):
+                state = cur_ctx().find_object(self.LogState)
+                if state.trace_alloc is None:
+                    return user_func(*args, **kwargs)
+                tracer = AllocationTracer(state.trace_alloc)
+                self._tracer = tracer
+                self._tracer_sites = n_sites
+                try:
+                    with tracer:
+                        returnobj = user_func(*args, **kwargs)
+                finally:
+                    self._tracer = None
+                message = (
+                    f"Peak traced memory use = {format_bytes(tracer.peak)}."
+                )
+                if tracer.peak_snapshot is not None:
+                    message += f" Top {n_sites} allocation sites near peak:\n"
+                    message += tracer.top_sites(tracer.peak_snapshot, n_sites)
+                logger.log(level.upper(), message)
+                return returnobj
+
+            return wrapper
+
+        return decorator
+
+    def log_cpu_profile(self, level="debug", n_functions=DEFAULT_N_FUNCTIONS):
+        """Profile CPU use of (sub)command and log the hottest functions."""
+
+        def decorator(user_func):
+            user_func = _synchronous(user_func)
+
+            @functools.wraps(user_func)
+            def wrapper(*args, **kwargs):
+                state = cur_ctx().find_object(self.LogState)
+                if state.profile is None:
+                    return user_func(*args, **kwargs)
+                profiler = make_profiler(state.profile, self._profile_interval)
+                if profiler.mode != state.profile:
+                    logger.warning(
+                        f"CPU profile mode {state.profile} is unavailable"
+                        + f" here, using {profiler.mode} instead"
+                    )
+                with profiler:
+                    returnobj = user_func(*args, **kwargs)
+                stats = profiler.stats()
+                if state.logfile_path is not None:
+                    logfile_path = state.logfile_path
+                    write_stats(stats, _side_path(logfile_path, ".pstats"))
+                    collapsed = profiler.collapsed()
+                    if collapsed:
+                        write_collapsed(
+                            collapsed, _side_path(logfile_path, ".collapsed")
+                        )
+                logger.log(
+                    level.upper(),
+                    f"CPU profile ({profiler.mode}), top {n_functions}"
+                    + " functions by self time:\n"
+                    + profile_summary(stats, n_functions),
+                )
+                return returnobj
+
+            return wrapper
+
+        return decorator
+
     def stash_subcommand(self):
         """Save the subcommand to the context object."""
 
         def decorator(user_func):
+            user_func = _synchronous(user_func)
+
             @functools.wraps(user_func)
             def wrapper(*args, **kwargs):
                 state = cur_ctx().find_object(self.LogState)
@@ -314,27 +829,205 @@ class ClickLoguru:
         state.user_options[param.name] = value
         return value
 
+    @property
+    def phase(self):
+        """Return the current phase of this thread or asyncio task.
+
+        A task that has not started a phase of its own is in the phase of
+        the task that created it.
+        """
+        phase_state = self._phase_state.get()
+        return None if phase_state is None else phase_state[0]
+
+    def _latest_phase(self):
+        """Return the most recently started phase still running, if any.
+
+        Unlike ``phase``, this may be called from any thread.
+        """
+        with self._running_lock:
+            phases = list(self._running_phases.values())
+        return phases[-1] if phases else None
+
     def elapsed_time(self, phase):
-        """Log the elapsed time of a phase."""
-        old_phase = self.phase
+        """Log the elapsed time of a phase.
+
+        Each thread and asyncio task has its own current phase, and
+        phases from all of them are merged in the timing summary.  A task
+        inherits the phase state of the task that created it, but that
+        phase belongs to its owner, so the new task starts with no phase
+        of its own and its phases nest inside the inherited one.  The
+        peak memory and allocation changes of a phase are measured from
+        its own start, whatever other phases start and end meanwhile.
+        """
+        owner = _phase_owner()
+        old_state = self._phase_state.get()
+        if old_state is not None and old_state[3] != owner:
+            old_state = None
+        with self._running_lock:
+            self._running_phases.pop(owner, None)
+            if phase is not None:
+                self._running_phases[owner] = phase.capitalize()
+        rss = peak = peak_key = start_rss = None
+        sampler = self._sampler
+        if sampler is not None:
+            if old_state is not None:
+                rss, peak = sampler.end_peak(old_state[2].get("peak_key"))
+            if phase is not None:
+                peak_key, start_rss = sampler.start_peak()
+            if sampler.timeline is not None:
+                sampler.timeline.mark(phase and phase.capitalize())
+        if self._usage_start is not None:
+            usage = resource_usage()
+        else:
+            usage = None
+        if self._tracer is not None:
+            snapshot = self._tracer.mark()
+        else:
+            snapshot = None
+        if old_state is not None:
+            self._timer_tree.stop(old_state[1])
         if phase is None:
-            self.phase = None
+            self._phase_state.set(None)
         else:
-            self.phase = phase.capitalize()
-            self.start_times[self.phase] = {
-                "wall": datetime.now(),
-                "process": process_time(),
-            }
-        if old_phase is None:
+            phase = phase.capitalize()
+            self._phase_state.set(
+                (
+                    phase,
+                    self._timer_tree.start(phase),
+                    {
+                        "wall": time(),
+                        "process": process_time(),
+                        "rss": start_rss,
+                        "peak_key": peak_key,
+                        "usage": usage,
+                        "snapshot": snapshot,
+                    },
+                    owner,
+                )
+            )
+        if old_state is None:
             return
+        old_phase, unused_token, start, unused_owner = old_state
         logger.log(
-            self.timer_log_level, self._format_time(old_phase),
+            self.timer_log_level,
+            self._format_time(old_phase, rss, peak, start=start),
         )
+        if snapshot is not None:
+            self._log_phase_allocations(
+                old_phase, snapshot, start.get("snapshot")
+            )
+        start_usage = start.get("usage")
+        if usage is not None and start_usage is not None:
+            delta = usage_delta(start_usage, usage)
+            delta.pop("max_rss", None)  # not a per-phase quantity
+            logger.log(
+                self.timer_log_level,
+                f"{old_phase} resource usage: {format_usage(delta)}",
+            )
 
-    def _format_time(self, phase_name):
+    def _log_phase_allocations(self, phase_name, snapshot, old_snapshot):
+        """Log top allocation sites and changes over a phase.
+
+        Changes are left out for a phase that started before tracing.
+        """
+        tracer, n_sites = self._tracer, self._tracer_sites
+        logger.log(
+            self.timer_log_level,
+            f"{phase_name} top {n_sites} allocation sites:\n"
+            + tracer.top_sites(snapshot, n_sites),
+        )
+        if old_snapshot is None:
+            return
+        logger.log(
+            self.timer_log_level,
+            f"{phase_name} largest allocation changes:\n"
+            + tracer.changed_sites(snapshot, old_snapshot, n_sites),
+        )
+
+    def _write_metrics(self, state, subcommand, metrics_prefix, exit_status):
+        """Write run metrics to an OpenMetrics textfile."""
+        labels = {"name": self._name, "version": self._version}
+        if subcommand is not None:
+            labels["subcommand"] = subcommand
+        text = format_metrics(
+            labels,
+            self._timer_tree.as_dict(),
+            exit_status,
+            self.start_times["Total"]["wall"],
+            peak_rss=state.peak_rss,
+        )
+        metrics_path = Path(self._metrics_dir) / (
+            metrics_prefix + METRICS_SUFFIX
+        )
+        try:
+            write_metrics(text, metrics_path)
+        except OSError as error:
+            logger.warning(f"Unable to write metrics file: {error}")
+
+    def _record_history(self, state, subcommand, log_dir_path, exit_status):
+        """Add this run to the run-history database."""
+        timings = self._timer_tree.as_dict()
+        run = {
+            "name": self._name,
+            "subcommand": subcommand,
+            "version": self._version,
+            "command_line": " ".join(sys.argv),
+            "start_time": self.start_times["Total"]["wall"],
+            "wall": timings["wall"],
+            "cpu": timings["cpu"],
+            "max_mem": state.peak_rss,
+            "exit_status": exit_status,
+        }
+        if state.logfile_path is not None:
+            run["logfile"] = str(state.logfile_path)
+        history_path = log_dir_path / (self._name + HISTORY_SUFFIX)
+        try:
+            RunHistory(history_path).record(run, timings)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning(f"Unable to record run history: {error}")
+
+    def worker_logging(self, context=None):
+        """Return a WorkerLogging to log from worker processes.
+
+        Use it as a context manager around a process pool, and pass its
+        ``initializer`` and ``initargs`` to the pool.
+        """
+        state = cur_ctx().find_object(self.LogState)
+        levels = [self._get_stderr_log_level(state)]
+        if state.logfile_handler_id is not None:
+            levels.append(self._file_log_level)
+        levels += list(state.module_levels.values())
+        level = min(logger.level(name.upper()).no for name in levels)
+        return WorkerLogging(level=level, context=context)
+
+    def timer(self, name):
+        """Return a context manager and decorator that times a phase.
+
+        Timers nest, and times are accumulated in a tree that is
+        reported by ``log_elapsed_time``.
+        """
+        return PhaseTimer(self._timer_tree, name)
+
+    def hot_timer(self, name):
+        """Return the aggregating timer of this name for hot code paths.
+
+        Statistics are reported once by ``log_elapsed_time``.
+        """
+        hot_timer = self._hot_timers.get(name)
+        if hot_timer is None:
+            hot_timer = self._hot_timers[name] = HotTimer(name)
+        return hot_timer
+
+    def _format_time(self, phase_name, rss=None, peak=None, start=None):
         """Return a formatted elapsed time string."""
-        wall = str(datetime.now() - self.start_times[phase_name]["wall"])[
-            :SKIP_FIELDS
-        ]
-        cpu = process_time() - self.start_times[phase_name]["process"]
-        return f"{phase_name} elapsed time is {wall}, {cpu:.1f} s process CPU"
+        if start is None:
+            start = self.start_times[phase_name]
+        wall = format_seconds(time() - start["wall"])
+        cpu = process_time() - start["process"]
+        message = (
+            f"{phase_name} elapsed time is {wall}, {cpu:.1f} s process CPU"
+        )
+        if peak is not None and start.get("rss") is not None:
+            delta = format_bytes(rss - start["rss"], sign=True)
+            message += f", peak {format_bytes(peak)} ({delta})"
+        return message
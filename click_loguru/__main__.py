@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Summarize, compare, and merge runs from their numbered log files.
+
+Usage::
+
+    python -m click_loguru summarize [LOG_DIR]
+    python -m click_loguru compare [LOG_DIR] [--prefix NAME-SUBCOMMAND]
+    python -m click_loguru history [LOG_DIR] [--phase Total/PHASE]
+    python -m click_loguru merge LOGFILE... [--output MERGED_LOGFILE]
+"""
+
+# standard library imports
+import gzip
+from pathlib import Path
+from time import localtime
+from time import strftime
+
+# third-party imports
+import click
+
+# module imports
+from .analysis import DEFAULT_THRESHOLD
+from .analysis import compare_runs
+from .analysis import find_logfiles
+from .analysis import format_trends
+from .analysis import summarize_log
+from .history import DEFAULT_LAST_RUNS
+from .history import DEFAULT_PERCENTILES
+from .history import HISTORY_SUFFIX
+from .history import RunHistory
+from .memory import format_bytes
+from .merge import merge_logs
+from .merge import tag_record
+
+# global constants
+DEFAULT_LOG_DIR = "logs"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _log_dir_argument(user_func):
+    """Define the log directory argument."""
+    return click.argument(
+        "log_dir",
+        type=click.Path(exists=True, file_okay=False),
+        default=DEFAULT_LOG_DIR,
+    )(user_func)
+
+
+def _prefix_option(user_func):
+    """Define the log-file prefix option."""
+    return click.option(
+        "--prefix",
+        default=None,
+        metavar="NAME[-SUBCOMMAND]",
+        help="Only use log files with this prefix.",
+    )(user_func)
+
+
+@click.group()
+def cli():
+    """Analyze click_loguru log files."""
+
+
+@cli.command()
+@_log_dir_argument
+@_prefix_option
+def summarize(log_dir, prefix):
+    """Show total time and memory of each retained run."""
+    for name, paths in find_logfiles(log_dir, prefix).items():
+        click.echo(f"{name}:")
+        for path in paths:
+            summary = summarize_log(path)
+            total = summary["phases"].get("Total")
+            message = f"  {path.name}:"
+            if total is None:
+                message += " no elapsed time"
+            else:
+                message += f" {total['wall']:.0f} s, {total['cpu']:.1f} s CPU"
+            if summary["max_mem"] is not None:
+                message += f", peak {format_bytes(summary['max_mem'])}"
+            n_phases = len(summary["phases"]) - (total is not None)
+            if n_phases:
+                message += f", {n_phases} phases"
+            click.echo(message)
+
+
+@cli.command()
+@_log_dir_argument
+@_prefix_option
+@click.option(
+    "--threshold",
+    type=click.FloatRange(min=0.0),
+    default=DEFAULT_THRESHOLD,
+    show_default=True,
+    help="Fractional increase over earlier runs that is a regression.",
+)
+def compare(log_dir, prefix, threshold):
+    """Show per-phase trends and flag regressions of the newest run.
+
+    Exits with status 1 if there are any regressions.
+    """
+    n_regressions = 0
+    for name, paths in find_logfiles(log_dir, prefix).items():
+        if len(paths) < 2:
+            continue
+        rows = compare_runs([summarize_log(p) for p in paths], threshold)
+        if not rows:
+            continue
+        click.echo(f"{name} ({paths[-1].name} vs. {len(paths) - 1} earlier):")
+        click.echo(format_trends(rows))
+        n_regressions += sum(row[-1] for row in rows)
+    if n_regressions:
+        raise click.ClickException(f"{n_regressions} regressions found")
+
+
+def _format_run(run):
+    """Return a one-line description of a run from the history."""
+    started = strftime(TIMESTAMP_FORMAT, localtime(run["start_time"]))
+    message = f"{started} {run['subcommand'] or '-'} {run['version']}:"
+    message += f" {run['wall']:.1f} s, {run['cpu']:.1f} s CPU"
+    if run["max_mem"] is not None:
+        message += f", peak {format_bytes(run['max_mem'])}"
+    if run["exit_status"]:
+        message += f", exit status {run['exit_status']}"
+    return message
+
+
+@cli.command()
+@click.argument(
+    "history_path", type=click.Path(exists=True), default=DEFAULT_LOG_DIR
+)
+@click.option("--subcommand", default=None, help="Only use this subcommand.")
+@click.option(
+    "--phase",
+    default=None,
+    metavar="Total/PHASE",
+    help="Only show this phase path.",
+)
+@click.option(
+    "--last",
+    type=click.IntRange(min=1),
+    default=DEFAULT_LAST_RUNS,
+    show_default=True,
+    help="Number of most recent runs to use.",
+)
+@click.option(
+    "--metric",
+    type=click.Choice(("wall", "cpu", "calls")),
+    default="wall",
+    show_default=True,
+    help="Phase statistic to show.",
+)
+@click.option("--runs", "list_runs", is_flag=True, help="List runs instead.")
+def history(history_path, subcommand, phase, last, metric, list_runs):
+    """Show phase statistics or runs from a run-history database.
+
+    HISTORY_PATH is a history database or a log directory holding them.
+    """
+    history_path = Path(history_path)
+    if history_path.is_dir():
+        paths = sorted(history_path.glob("*" + HISTORY_SUFFIX))
+    else:
+        paths = [history_path]
+    for path in paths:
+        click.echo(f"{path.name}:")
+        run_history = RunHistory(path)
+        if list_runs:
+            for run in run_history.runs(subcommand, last):
+                click.echo("  " + _format_run(run))
+            continue
+        stats = run_history.phase_stats(phase, subcommand, last, metric)
+        if not stats:
+            continue
+        columns = ["Runs", "Mean", "Max"]
+        columns += [f"p{p}" for p in DEFAULT_PERCENTILES]
+        name_width = max(len("Phase"), max(len(name) for name in stats))
+        click.echo(
+            f"{'Phase':<{name_width}}"
+            + "".join(f" {column:>10}" for column in columns)
+        )
+        for name, phase_stats in stats.items():
+            values = [phase_stats["mean"], phase_stats["max"]]
+            values += [phase_stats[f"p{p}"] for p in DEFAULT_PERCENTILES]
+            click.echo(
+                f"{name:<{name_width}} {phase_stats['count']:10d}"
+                + "".join(f" {value:10.2f}" for value in values)
+            )
+
+
+@cli.command()
+@click.argument(
+    "logfiles", nargs=-1, required=True, type=click.Path(exists=True)
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False),
+    default="-",
+    help="Merged log file, compressed if it ends in .gz  [default: stdout]",
+)
+def merge(logfiles, output):
+    """Merge log files into one stream in time order.
+
+    Each line is tagged with the name of its log file, or with its path
+    if names are not unique.  Log files may be gzip-compressed.
+    """
+    if output.endswith(".gz"):
+        merged = gzip.open(output, "wt", encoding="utf8")
+    else:
+        merged = click.open_file(output, "w", encoding="utf8")
+    with merged:
+        for source, lines in merge_logs(logfiles):
+            merged.writelines(tag_record(source, lines))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    cli()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Attribute memory allocations to source lines with tracemalloc."""
+
+# standard library imports
+import threading
+
+# module imports
+from .memory import format_bytes
+from .periodic import PeriodicThread
+
+# global constants
+DEFAULT_N_SITES = 10
+DEFAULT_TRACE_INTERVAL = 0.05  # seconds between checks for a new peak
+PEAK_GROWTH = 0.1  # fraction by which a new peak must exceed the last
+IGNORED_FILES = ("<frozen importlib._bootstrap>", "<unknown>")
+
+
+def _take_snapshot():
+    """Return a tracemalloc snapshot without tracemalloc's own blocks."""
+    import tracemalloc
+
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    filters += [tracemalloc.Filter(False, name) for name in IGNORED_FILES]
+    return tracemalloc.take_snapshot().filter_traces(filters)
+
+
+def _format_site(traceback):
+    """Return an allocation traceback, most recent call first."""
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+    return " <- ".join(reversed(frames))
+
+
+def allocation_report(stats, n_sites=DEFAULT_N_SITES):
+    """Return a table of the top allocation sites or changes in them.
+
+    ``stats`` is the result of ``Snapshot.statistics`` or of
+    ``Snapshot.compare_to``, which also shows the changes.
+    """
+    lines = []
+    for stat in stats[:n_sites]:
+        line = f"{format_bytes(stat.size):>10} {stat.count:>11,} blocks"
+        if hasattr(stat, "size_diff"):
+            if not stat.size_diff:
+                continue
+            line += f" {format_bytes(stat.size_diff, sign=True):>10}"
+            line += f" {stat.count_diff:>+11,} blocks"
+        lines.append(f"{line}  {_format_site(stat.traceback)}")
+    return "\n".join(lines)
+
+
+class AllocationTracer(PeriodicThread):
+    """Trace allocations and keep a snapshot at the peak.
+
+    ``tracemalloc`` is started with ``n_frames`` frames per allocation.
+    A daemon thread checks the traced size every ``interval`` seconds
+    and takes a snapshot whenever it exceeds the size of the last peak
+    snapshot by ``PEAK_GROWTH``, so ``peak_snapshot`` shows allocations
+    within about that fraction of the peak.  Tracing slows the program
+    several-fold and raises its memory use, so use it to find out what
+    allocates, not how much.
+    """
+
+    thread_name = "allocation tracer"
+
+    def __init__(self, n_frames=1, interval=DEFAULT_TRACE_INTERVAL):
+        """Set frames per allocation and interval between peak checks."""
+        super().__init__(interval)
+        self.n_frames = n_frames
+        self.interval = interval
+        self.key_type = "traceback" if n_frames > 1 else "lineno"
+        self.peak = 0
+        self.peak_snapshot = None
+        self._peak_snapshot_size = 0
+        self._lock = threading.Lock()
+
+    def check_peak(self):
+        """Take a peak snapshot if traced memory has grown enough."""
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        if current > self._peak_snapshot_size * (1.0 + PEAK_GROWTH):
+            snapshot = _take_snapshot()
+            with self._lock:
+                if current > self._peak_snapshot_size:
+                    self.peak_snapshot = snapshot
+                    self._peak_snapshot_size = current
+
+    def mark(self):
+        """Check for a new peak and return a snapshot of traced memory."""
+        self.check_peak()
+        return _take_snapshot()
+
+    def top_sites(self, snapshot, n_sites=DEFAULT_N_SITES):
+        """Return a table of the top allocation sites in a snapshot."""
+        return allocation_report(snapshot.statistics(self.key_type), n_sites)
+
+    def changed_sites(self, snapshot, old_snapshot, n_sites=DEFAULT_N_SITES):
+        """Return a table of the largest changes between snapshots."""
+        return allocation_report(
+            snapshot.compare_to(old_snapshot, self.key_type), n_sites
+        )
+
+    def tick(self):
+        """Check for a new peak."""
+        self.check_peak()
+
+    def start(self):
+        """Start tracing."""
+        import tracemalloc
+
+        tracemalloc.start(self.n_frames)
+        return super().start()
+
+    def stop(self):
+        """Stop tracing and return the peak traced size in bytes."""
+        import tracemalloc
+
+        super().stop()
+        self.check_peak()
+        tracemalloc.stop()
+        return self.peak
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Summarize and compare runs from their log files.
+
+Log files are scanned for the messages written by ``elapsed_time``,
+``log_elapsed_time``, and ``log_peak_memory_use`` without reading them
+into memory: plain files are memory-mapped and searched with a regular
+expression, and compressed files are read a line at a time.
+"""
+
+# standard library imports
+import gzip
+import mmap
+import re
+from pathlib import Path
+
+# module imports
+from .memory import GIGABYTE
+from .memory import MEGABYTE
+from .memory import format_bytes
+from .timeline import SPARK_CHARS
+
+# global constants
+LOGFILE_RE = re.compile(r"^(?P<prefix>.+)_(?P<number>\d+)\.log(?:\.gz)?$")
+RECORD_RE = re.compile(
+    rb'(?:- |"message":")(?:'
+    rb"(?P<phase>[^\n\"]+?) elapsed time is"
+    rb" (?P<hours>\d+):(?P<minutes>\d\d):(?P<seconds>\d\d),"
+    rb" (?P<cpu>[\d.]+) s process CPU"
+    rb"(?:, peak (?P<peak>[\d.]+) (?P<unit>[MG]B))?"
+    rb"|Peak total memory use = (?P<max_mem>\d+) MB)"
+)
+METRICS = ("wall", "cpu", "peak")
+DEFAULT_THRESHOLD = 0.25  # fractional increase that is a regression
+MIN_CHANGE = {  # smaller increases are never regressions
+    "wall": 2.0,  # seconds, as wall times are logged to the second
+    "cpu": 0.5,  # seconds
+    "peak": 16 * MEGABYTE,
+    "max_mem": 16 * MEGABYTE,
+}
+UNITS = {b"MB": MEGABYTE, b"GB": GIGABYTE}
+
+
+def find_logfiles(log_dir, prefix=None):
+    """Return numbered log files by prefix, each list oldest first."""
+    runs = {}
+    for path in Path(log_dir).iterdir():
+        match = LOGFILE_RE.match(path.name)
+        if match is None or (prefix and match["prefix"] != prefix):
+            continue
+        runs.setdefault(match["prefix"], []).append(
+            (int(match["number"]), path)
+        )
+    return {
+        name: [path for unused_number, path in sorted(paths)]
+        for name, paths in sorted(runs.items())
+    }
+
+
+def _records(path):
+    """Yield matches of timing and memory messages in a log file."""
+    path = Path(path)
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as logfile:
+            for line in logfile:
+                match = RECORD_RE.search(line)
+                if match is not None:
+                    yield match
+        return
+    with path.open("rb") as logfile:
+        if path.stat().st_size == 0:
+            return
+        with mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from RECORD_RE.finditer(data)
+
+
+def summarize_log(path):
+    """Return phase timings and peak memory from a log file.
+
+    The result maps ``phases`` to a dict of phase name to ``wall`` and
+    ``cpu`` seconds and ``peak`` bytes (``None`` if not logged), summed
+    or maximized over repeats of a phase, and ``max_mem`` to the peak
+    total memory use in bytes, or ``None``.
+    """
+    phases = {}
+    max_mem = None
+    for match in _records(path):
+        if match["max_mem"] is not None:
+            max_mem = int(match["max_mem"]) * MEGABYTE
+            continue
+        name = match["phase"].decode("utf8", errors="replace")
+        wall = (
+            3600 * int(match["hours"])
+            + 60 * int(match["minutes"])
+            + int(match["seconds"])
+        )
+        phase = phases.setdefault(
+            name, {"wall": 0.0, "cpu": 0.0, "peak": None}
+        )
+        phase["wall"] += wall
+        phase["cpu"] += float(match["cpu"])
+        if match["peak"] is not None:
+            peak = int(float(match["peak"]) * UNITS[match["unit"]])
+            phase["peak"] = max(phase["peak"] or 0, peak)
+    return {"phases": phases, "max_mem": max_mem}
+
+
+def _format_value(metric, value):
+    """Return a metric value as a short string."""
+    if value is None:
+        return "-"
+    if metric == "peak":
+        return format_bytes(value)
+    return f"{value:.1f} s"
+
+
+def _spark(values):
+    """Return a sparkline of values on a scale from zero to their max."""
+    top = max((v for v in values if v is not None), default=0)
+    chars = []
+    for value in values:
+        if value is None:
+            chars.append(" ")
+        else:
+            level = int(value / top * (len(SPARK_CHARS) - 1)) if top else 0
+            chars.append(SPARK_CHARS[level])
+    return "".join(chars)
+
+
+def compare_runs(summaries, threshold=DEFAULT_THRESHOLD):
+    """Return trend rows and regressions of the newest run.
+
+    ``summaries`` are from ``summarize_log``, oldest first.  Each row is
+    (phase, metric, values oldest first, mean of earlier runs, newest
+    value, regressed).  The newest run regresses on a metric if it
+    exceeds the mean of the earlier runs by more than ``threshold`` of
+    that mean and by more than ``MIN_CHANGE``.
+    """
+    names = []
+    for summary in summaries:
+        for name in summary["phases"]:
+            if name not in names:
+                names.append(name)
+    series = []
+    for name in names:
+        for metric in METRICS:
+            values = [s["phases"].get(name, {}).get(metric) for s in summaries]
+            series.append((name, metric, values))
+    series.append(("Total", "max_mem", [s["max_mem"] for s in summaries]))
+    rows = []
+    for name, metric, values in series:
+        if all(v is None for v in values):
+            continue
+        newest = values[-1]
+        earlier = [v for v in values[:-1] if v is not None]
+        mean = sum(earlier) / len(earlier) if earlier else None
+        regressed = (
+            newest is not None
+            and mean is not None
+            and newest - mean > threshold * mean
+            and newest - mean > MIN_CHANGE[metric]
+        )
+        rows.append((name, metric, values, mean, newest, regressed))
+    return rows
+
+
+def format_trends(rows):
+    """Return trend rows as a table with a sparkline per row."""
+    name_width = max([len("Phase")] + [len(row[0]) for row in rows])
+    spark_width = max([len("Trend")] + [len(row[2]) for row in rows])
+    lines = [
+        f"{'Phase':<{name_width}} {'Metric':<7} {'Trend':<{spark_width}}"
+        + f" {'Earlier':>10} {'Newest':>10} {'Change':>7}"
+    ]
+    for name, metric, values, mean, newest, regressed in rows:
+        unit_metric = "peak" if metric == "max_mem" else metric
+        if mean and newest is not None:
+            change = f"{100.0 * (newest - mean) / mean:+6.0f}%"
+        else:
+            change = "-"
+        lines.append(
+            f"{name:<{name_width}} {metric:<7}"
+            + f" {_spark(values):<{spark_width}}"
+            + f" {_format_value(unit_metric, mean):>10}"
+            + f" {_format_value(unit_metric, newest):>10} {change:>7}"
+            + (" REGRESSION" if regressed else "")
+        )
+    return "\n".join(lines)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Log filters for click_loguru."""
+
+# standard library imports
+import functools
+import threading
+from time import monotonic
+
+# third-party imports
+from loguru import logger
+
+# global constants
+DEFAULT_BURST = 10  # messages a call site may log at once
+DEFAULT_EXEMPT_LEVEL = "ERROR"
+
+
+def _level_no(level):
+    """Return the number of a level given by name or number."""
+    if isinstance(level, int):
+        return level
+    return logger.level(level.upper()).no
+
+
+def chain_filters(*filters):
+    """Return a filter passing records that pass all filters not None."""
+    filters = [f for f in filters if f is not None]
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+
+    def chained_filter(record):
+        """Apply filters in order."""
+        for log_filter in filters:
+            if not log_filter(record):
+                return False
+        return True
+
+    return chained_filter
+
+
+class ModuleLevelFilter:
+    """Filter records by per-module minimum levels.
+
+    ``module_levels`` maps module names to level names or numbers and
+    applies to submodules as well, with the longest match winning.
+    Modules not covered use ``default_level``.  The level for each record
+    name is worked out once and cached, so filtering a record costs one
+    dict lookup.  Sinks using this filter must have a level no higher
+    than ``min_level``.
+    """
+
+    def __init__(self, module_levels, default_level):
+        """Convert levels to numbers."""
+        self._levels = {
+            module: _level_no(level) for module, level in module_levels.items()
+        }
+        self._default_no = _level_no(default_level)
+        self.min_level = min([self._default_no] + list(self._levels.values()))
+        self._cache = {}
+
+    def level_no(self, name):
+        """Return the minimum level number for a record name."""
+        module = name
+        while True:
+            if module in self._levels:
+                return self._levels[module]
+            if "." not in module:
+                return self._default_no
+            module = module.rsplit(".", 1)[0]
+
+    def __call__(self, record):
+        """Return whether a record is at or above its module's level."""
+        name = record["name"]
+        try:
+            level_no = self._cache[name]
+        except KeyError:
+            level_no = self._cache[name] = self.level_no(name)
+        return record["level"].no >= level_no
+
+
+def _patch_location(fields, record):
+    """Patch a record with the location of a call site."""
+    record.update(fields)
+
+
+class _CallSite:
+    """Rate-limiting state of one logging call site."""
+
+    __slots__ = (
+        "fields",
+        "level",
+        "message",
+        "repeats",
+        "suppressed",
+        "tokens",
+        "time",
+    )
+
+    def __init__(self, record, tokens, now):
+        """Start with a full token bucket."""
+        self.fields = {
+            "name": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+        }
+        self.level = record["level"].name
+        self.message = None
+        self.repeats = 0
+        self.suppressed = 0
+        self.tokens = tokens
+        self.time = now
+
+    def take_summaries(self):
+        """Return and reset messages about suppressed records."""
+        summaries = []
+        if self.repeats:
+            summaries.append(f"last message repeated {self.repeats:,} times")
+        if self.suppressed:
+            summaries.append(
+                f"{self.suppressed:,} messages suppressed by rate limit"
+            )
+        self.repeats = self.suppressed = 0
+        return summaries
+
+
+class RateLimitFilter:
+    """Rate-limit and deduplicate log messages per call site.
+
+    Each call site (module and line) gets a token bucket that refills at
+    ``rate`` messages per second up to ``burst`` messages; records that
+    find the bucket empty are dropped.  If ``dedup`` is set, a message
+    identical to the last one logged from the same call site is dropped
+    too.  When a call site next logs, or when ``flush`` is called, the
+    number of dropped records is logged from that call site.  Records at
+    ``exempt_level`` and above always pass.
+
+    Use the same instance as the filter of every sink, so that all sinks
+    keep or drop the same records.
+    """
+
+    def __init__(
+        self,
+        rate=None,
+        burst=DEFAULT_BURST,
+        dedup=True,
+        exempt_level=DEFAULT_EXEMPT_LEVEL,
+    ):
+        """Set rate in messages per second (None for unlimited)."""
+        self._rate = rate
+        self._burst = burst
+        self._dedup = dedup
+        self._exempt_no = _level_no(exempt_level)
+        self._sites = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __call__(self, record):
+        """Return whether a record should be logged."""
+        local = self._local
+        if getattr(local, "emitting", False):
+            return True
+        if record is getattr(local, "record", None):
+            return local.allowed  # already decided for an earlier sink
+        if record["level"].no >= self._exempt_no:
+            allowed, site, summaries = True, None, []
+        else:
+            allowed, site, summaries = self._decide(record)
+        local.record = record
+        local.allowed = allowed
+        if summaries:
+            self._emit(site, summaries)
+        return allowed
+
+    def _decide(self, record):
+        """Update call-site state and decide whether to log a record."""
+        key = (record["name"], record["line"])
+        message = record["message"]
+        now = monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = _CallSite(record, self._burst, now)
+            if self._dedup and message == site.message:
+                site.repeats += 1
+                return False, site, []
+            if self._rate is not None:
+                site.tokens = min(
+                    self._burst, site.tokens + (now - site.time) * self._rate
+                )
+                site.time = now
+                if site.tokens < 1.0:
+                    site.suppressed += 1
+                    return False, site, []
+                site.tokens -= 1.0
+            site.message = message
+            return True, site, site.take_summaries()
+
+    def _emit(self, site, summaries):
+        """Log summaries from the location of a call site."""
+        self._local.emitting = True
+        try:
+            site_logger = logger.patch(
+                functools.partial(_patch_location, site.fields)
+            )
+            for summary in summaries:
+                site_logger.log(site.level, summary)
+        finally:
+            self._local.emitting = False
+
+    def flush(self):
+        """Log summaries for all call sites with dropped records."""
+        with self._lock:
+            pending = [
+                (site, site.take_summaries()) for site in self._sites.values()
+            ]
+        for site, summaries in pending:
+            if summaries:
+                self._emit(site, summaries)
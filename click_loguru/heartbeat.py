@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Heartbeat and stall watchdog for long-running commands."""
+
+# standard library imports
+import sys
+import threading
+from time import perf_counter
+from time import process_time
+
+# third-party imports
+from loguru import logger
+
+# module imports
+from .memory import format_bytes
+from .memory import total_rss
+from .periodic import PeriodicThread
+from .periodic import daemon_cpu_time
+from .timers import format_seconds
+
+# global constants
+STALL_CPU_FRACTION = 0.01  # CPU per wall second below which CPU is stalled
+STALL_CHECKS = 4  # stall checks per stall timeout
+
+
+def thread_stacks():
+    """Return the stacks of all other threads as text."""
+    import traceback
+
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = []
+    # pylint: disable=protected-access
+    for ident, frame in sys._current_frames().items():
+        if ident == threading.get_ident():
+            continue
+        stacks.append(
+            f'Thread "{names.get(ident, ident)}":\n'
+            + "".join(traceback.format_stack(frame)).rstrip("\n")
+        )
+    return "\n".join(stacks)
+
+
+class Heartbeat(PeriodicThread):
+    """Log progress and warn of stalls from a daemon thread.
+
+    Every ``interval`` seconds, the current phase from ``get_phase``,
+    the wall and process CPU time since start, the CPU utilization since
+    the last heartbeat, and the RSS of this process and its descendants
+    are logged at ``level``.  If ``stall_timeout`` is set, a WARNING is
+    logged once the CPU time of the threads of this process, other than
+    the daemon threads of click_loguru such as this one and the memory
+    sampler, has advanced by less than ``STALL_CPU_FRACTION`` of wall
+    time for that many seconds, with the stacks of all other threads if
+    ``dump_stacks`` is true.  Either of
+    ``interval`` and ``stall_timeout`` may be ``None`` to turn it off.
+    The phase is bound to each message, so that it is the ``phase`` field
+    of JSON log files rather than that of the heartbeat thread.
+    """
+
+    thread_name = "heartbeat"
+
+    def __init__(
+        self,
+        interval=None,
+        stall_timeout=None,
+        dump_stacks=False,
+        level="DEBUG",
+        get_phase=None,
+    ):
+        """Set intervals in seconds, log level, and phase function."""
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.dump_stacks = dump_stacks
+        self.level = level
+        self._get_phase = get_phase
+        checks = [interval]
+        if stall_timeout is not None:
+            checks.append(stall_timeout / STALL_CHECKS)
+        self.check_interval = min(c for c in checks if c is not None)
+        super().__init__(self.check_interval)
+        self.stalls = 0
+        self._reset(perf_counter(), process_time())
+
+    def _reset(self, wall, cpu):
+        """Start counting from the given wall and CPU times."""
+        self._start = self._last_beat = self._last_check = (wall, cpu)
+        self._advanced_at = wall
+        self._stalled = False
+
+    def check(self, wall, cpu):
+        """Log a heartbeat or stall warning if one is due.
+
+        ``wall`` is from ``perf_counter`` and ``cpu`` is process CPU time.
+        """
+        last_wall, last_cpu = self._last_check
+        self._last_check = (wall, cpu)
+        if self.stall_timeout is not None:
+            if cpu - last_cpu > STALL_CPU_FRACTION * (wall - last_wall):
+                if self._stalled:
+                    logger.log(
+                        self.level,
+                        "CPU time advancing again after"
+                        + f" {format_seconds(last_wall - self._advanced_at)}",
+                    )
+                self._advanced_at = wall
+                self._stalled = False
+            elif (
+                not self._stalled
+                and wall - self._advanced_at >= self.stall_timeout
+            ):
+                self._stalled = True
+                self.stalls += 1
+                self._warn_stall(wall - self._advanced_at)
+        if self.interval is not None:
+            if wall - self._last_beat[0] >= self.interval:
+                self._beat(wall, cpu)
+
+    def _phase(self):
+        """Return the current phase and it as a message prefix."""
+        phase = self._get_phase() if self._get_phase is not None else None
+        return phase, f"{phase} phase, " if phase else ""
+
+    def _beat(self, wall, cpu):
+        """Log a heartbeat."""
+        beat_wall, beat_cpu = self._last_beat
+        self._last_beat = (wall, cpu)
+        utilization = 100.0 * (cpu - beat_cpu) / max(wall - beat_wall, 1e-9)
+        phase, phase_text = self._phase()
+        # not "elapsed time is", which would read as a phase timing
+        message = (
+            f"Heartbeat: {phase_text}running for"
+            + f" {format_seconds(wall - self._start[0])},"
+            + f" {cpu - self._start[1]:.1f} s process CPU"
+            + f" ({utilization:.0f}% CPU)"
+        )
+        rss = total_rss()
+        if rss:
+            message += f", RSS {format_bytes(rss)}"
+        logger.bind(phase=phase).log(self.level, message)
+
+    def _warn_stall(self, stalled_seconds):
+        """Log a stall warning."""
+        phase, phase_text = self._phase()
+        message = (
+            f"Stalled: {phase_text}no CPU time used in"
+            + f" {format_seconds(stalled_seconds)}"
+        )
+        if self.dump_stacks:
+            message += "\n" + thread_stacks()
+        logger.bind(phase=phase).warning(message)
+
+    def tick(self):
+        """Check, leaving out the CPU time of click_loguru's own threads."""
+        self.check(perf_counter(), process_time() - daemon_cpu_time())
+
+    def start(self):
+        """Start the heartbeat."""
+        self._reset(perf_counter(), process_time())
+        return super().start()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""Run history of timings and memory use in an SQLite database."""
+
+# standard library imports
+import math
+from pathlib import Path
+
+# module imports
+from .timers import flatten_timings
+
+# global constants
+HISTORY_SUFFIX = ".history.sqlite"
+DEFAULT_LAST_RUNS = 200
+DEFAULT_PERCENTILES = (50, 95)
+LOCK_TIMEOUT = 30.0  # seconds to wait for another run's transaction
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    subcommand TEXT,
+    version TEXT,
+    command_line TEXT,
+    start_time REAL NOT NULL,
+    wall REAL,
+    cpu REAL,
+    max_mem INTEGER,
+    exit_status INTEGER,
+    logfile TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_subcommand
+    ON runs (subcommand, start_time);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    wall REAL NOT NULL,
+    cpu REAL NOT NULL,
+    calls INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phases_by_run ON phases (run_id, phase);
+"""
+RUN_COLUMNS = (
+    "name",
+    "subcommand",
+    "version",
+    "command_line",
+    "start_time",
+    "wall",
+    "cpu",
+    "max_mem",
+    "exit_status",
+    "logfile",
+)
+
+
+def percentile(sorted_values, percent):
+    """Return the nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent * len(sorted_values) / 100))
+    return sorted_values[rank - 1]
+
+
+class RunHistory:
+    """Store and query the timings and memory use of past runs.
+
+    Each run is one row of the ``runs`` table, and each node of its
+    timing tree is a row of the ``phases`` table, named by its path from
+    the root, e.g. ``Total/Load``.  A run is written in one transaction.
+    """
+
+    def __init__(self, path):
+        """Set the database path."""
+        self.path = Path(path)
+
+    def _connect(self):
+        """Return a connection, creating the tables if needed."""
+        import sqlite3
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=LOCK_TIMEOUT)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def record(self, run, timings):
+        """Add a run and its timing tree, returning the run id.
+
+        ``run`` is a dict with keys from ``RUN_COLUMNS``; missing keys
+        are stored as NULL.  ``timings`` is as from ``TimerTree.as_dict``.
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    f"INSERT INTO runs ({', '.join(RUN_COLUMNS)})"
+                    + f" VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+                    [run.get(column) for column in RUN_COLUMNS],
+                )
+                run_id = cursor.lastrowid
+                connection.executemany(
+                    "INSERT INTO phases VALUES (?, ?, ?, ?, ?)",
+                    [(run_id,) + row for row in flatten_timings(timings)],
+                )
+        finally:
+            connection.close()
+        return run_id
+
+    @staticmethod
+    def _last_runs(subcommand, last):
+        """Return a query and parameters for ids of the last runs."""
+        query = "SELECT id FROM runs"
+        params = []
+        if subcommand is not None:
+            query += " WHERE subcommand = ?"
+            params.append(subcommand)
+        query += " ORDER BY start_time DESC, id DESC LIMIT ?"
+        params.append(last)
+        return query, params
+
+    def runs(self, subcommand=None, last=DEFAULT_LAST_RUNS):
+        """Return the last runs as dicts, newest first."""
+        connection = self._connect()
+        try:
+            last_runs, params = self._last_runs(subcommand, last)
+            rows = connection.execute(
+                f"SELECT id, {', '.join(RUN_COLUMNS)} FROM runs"
+                + f" WHERE id IN ({last_runs})"
+                + " ORDER BY start_time DESC, id DESC",
+                params,
+            ).fetchall()
+        finally:
+            connection.close()
+        return [dict(zip(("id",) + RUN_COLUMNS, row)) for row in rows]
+
+    def phase_stats(
+        self,
+        phase=None,
+        subcommand=None,
+        last=DEFAULT_LAST_RUNS,
+        metric="wall",
+        percentiles=DEFAULT_PERCENTILES,
+    ):
+        """Return statistics of a phase metric over the last runs.
+
+        The result maps each phase path (only ``phase``, if given) to a
+        dict of ``count``, ``mean``, ``max``, and ``pNN`` percentiles of
+        ``wall``, ``cpu``, or ``calls``.
+        """
+        if metric not in ("wall", "cpu", "calls"):
+            raise ValueError(f"unknown metric {metric}")
+        connection = self._connect()
+        try:
+            last_runs, params = self._last_runs(subcommand, last)
+            query = (
+                f"SELECT phase, {metric} FROM phases"
+                + f" WHERE run_id IN ({last_runs})"
+            )
+            if phase is not None:
+                query += " AND phase = ?"
+                params.append(phase)
+            values = {}
+            for name, value in connection.execute(query, params):
+                values.setdefault(name, []).append(value)
+        finally:
+            connection.close()
+        stats = {}
+        for name, phase_values in values.items():
+            phase_values.sort()
+            stats[name] = {
+                "count": len(phase_values),
+                "mean": sum(phase_values) / len(phase_values),
+                "max": phase_values[-1],
+            }
+            for percent in percentiles:
+                stats[name][f"p{percent}"] = percentile(phase_values, percent)
+        return stats
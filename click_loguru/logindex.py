@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Allocate log-file numbers from a locked index file."""
+
+# standard library imports
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+def _lock(filehandle):
+    """Block until an exclusive lock is held on an open file."""
+    if fcntl is not None:
+        fcntl.lockf(filehandle, fcntl.LOCK_EX)
+    else:  # pragma: no cover
+        filehandle.seek(0)
+        msvcrt.locking(filehandle.fileno(), msvcrt.LK_LOCK, 1)
+
+
+class LogIndex:
+    """Hand out numbers for NAME[-SUBCOMMAND]_n.log files.
+
+    The first retained and next free log numbers are kept in a small
+    index file in the log directory.  The index is read and rewritten
+    under an exclusive lock, so concurrent runs always get distinct
+    numbers, and neither allocation nor retention pruning depends on the
+    number of files in the directory.  If the index does not exist yet,
+    it is built from a single scan of the directory.  Pruning removes
+    files with each of ``suffixes`` that share a log file's name.
+    """
+
+    def __init__(
+        self, log_dir_path, logfile_prefix, retention=None, suffixes=(".log",)
+    ):
+        """Set the directory, file prefix, and number of files to keep."""
+        self.log_dir_path = Path(log_dir_path)
+        self.logfile_prefix = logfile_prefix
+        self.retention = retention
+        self.suffixes = suffixes
+        self.index_path = self.log_dir_path / f".{logfile_prefix}.index"
+
+    def logfile_path(self, number):
+        """Return the path of a numbered log file."""
+        return self.log_dir_path / f"{self.logfile_prefix}_{number}.log"
+
+    def allocate(self):
+        """Return a new log number, removing log files beyond retention."""
+        self.log_dir_path.mkdir(parents=True, exist_ok=True)
+        with self.index_path.open("a+") as index_file:
+            _lock(index_file)
+            index_file.seek(0)
+            fields = index_file.read().split()
+            if len(fields) == 2 and all(f.isnumeric() for f in fields):
+                first, number = [int(f) for f in fields]
+            else:
+                first, number = self._scan()
+            if self.retention is not None:
+                while number - first > self.retention:
+                    logfile_path = self.logfile_path(first)
+                    for suffix in self.suffixes:
+                        try:
+                            logfile_path.with_suffix(suffix).unlink()
+                        except FileNotFoundError:
+                            pass
+                    first += 1
+            index_file.seek(0)
+            index_file.truncate()
+            index_file.write(f"{first} {number + 1}\n")
+            index_file.flush()
+        return number
+
+    def _scan(self):
+        """Return first and next log numbers from existing log files."""
+        prefix_len = len(self.logfile_prefix) + 1
+        numbers = []
+        for path in self.log_dir_path.glob(self.logfile_prefix + "_*.log*"):
+            number, unused_sep, suffix = path.name[prefix_len:].partition(
+                ".log"
+            )
+            if number.isnumeric() and suffix in ("", ".gz"):
+                numbers.append(int(number))
+        if not numbers:
+            return 0, 0
+        return min(numbers), max(numbers) + 1
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Low-overhead memory sampling for click_loguru."""
+
+# standard library imports
+import itertools
+import os
+import sys
+import threading
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+# module imports
+from .periodic import PeriodicThread
+
+# global constants
+DEFAULT_SAMPLE_INTERVAL = 0.1  # seconds
+MEGABYTE = 1024 * 1024
+GIGABYTE = 1024 * MEGABYTE
+PROC_PATH = Path("/proc")
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError):  # pragma: no cover
+    PAGE_SIZE = 4096
+
+
+def format_bytes(n_bytes, sign=False):
+    """Return a byte count as a short MB or GB string."""
+    if abs(n_bytes) >= GIGABYTE:
+        value, unit = n_bytes / GIGABYTE, "GB"
+    else:
+        value, unit = n_bytes / MEGABYTE, "MB"
+    if sign:
+        return f"{value:+.1f} {unit}"
+    return f"{value:.1f} {unit}"
+
+
+def process_rss(pid="self"):
+    """Return the resident set size of a process in bytes, 0 if gone."""
+    try:
+        with (PROC_PATH / str(pid) / "statm").open("rb") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def child_pids(pid="self"):
+    """Return the pids of the direct children of a process."""
+    pids = []
+    task_path = PROC_PATH / str(pid) / "task"
+    try:
+        tids = os.listdir(task_path)
+    except OSError:
+        return pids
+    for tid in tids:
+        try:
+            with (task_path / tid / "children").open("rb") as children:
+                pids.extend(children.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def total_rss():
+    """Return the RSS of this process and all its descendants in bytes."""
+    total = process_rss()
+    pids = child_pids()
+    while pids:
+        pid = pids.pop().decode()
+        total += process_rss(pid)
+        pids.extend(child_pids(pid))
+    return total
+
+
+def peak_rusage():
+    """Return peak RSS of this process plus its largest child in bytes."""
+    if resource is None:  # pragma: no cover
+        return 0
+    scale = 1 if sys.platform == "darwin" else 1024  # macOS reports bytes
+    return scale * (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+
+
+class MemorySampler(PeriodicThread):
+    """Track peak memory use from a daemon thread.
+
+    Every ``interval`` seconds the RSS of this process and all of its
+    descendants is read from /proc and the maximum is kept in ``peak``
+    (bytes), as well as for each phase from ``start_peak`` to its
+    ``end_peak``, so that phases of concurrent threads or tasks each get
+    the peak over their own span.  Where /proc is not available, the peak comes from
+    ``getrusage`` at stop time instead.  The measured code runs
+    undisturbed on its own thread.  Samples are also passed to the
+    ``sample`` method of ``timeline``, if given, which is closed on stop.
+    """
+
+    thread_name = "memory sampler"
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, timeline=None):
+        """Set sampling interval in seconds and optional timeline."""
+        super().__init__(interval)
+        self.interval = interval
+        self.timeline = timeline
+        self.peak = 0
+        self._has_proc = (PROC_PATH / "self" / "statm").exists()
+        self._phase_peaks = {}
+        self._phase_keys = itertools.count()
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """Record and return the current total RSS in bytes."""
+        rss = total_rss() if self._has_proc else 0
+        if rss > self.peak:
+            self.peak = rss
+        with self._lock:
+            for key, peak in self._phase_peaks.items():
+                if rss > peak:
+                    self._phase_peaks[key] = rss
+        if self.timeline is not None:
+            self.timeline.sample(rss)
+        return rss
+
+    def start_peak(self):
+        """Start tracking a phase peak and return its key and current RSS."""
+        rss = self.sample()
+        with self._lock:
+            key = next(self._phase_keys)
+            self._phase_peaks[key] = rss
+        return key, rss
+
+    def end_peak(self, key):
+        """Return current RSS and the peak of a phase, in bytes.
+
+        The peak is ``None`` for a key not from ``start_peak``.
+        """
+        rss = self.sample()
+        with self._lock:
+            peak = self._phase_peaks.pop(key, None)
+        return rss, peak
+
+    def tick(self):
+        """Take a sample."""
+        self.sample()
+
+    def start(self):
+        """Start sampling."""
+        self.sample()
+        return super().start()
+
+    def stop(self):
+        """Stop sampling and return the peak total RSS in bytes."""
+        super().stop()
+        rss = self.sample()
+        if self.timeline is not None:
+            self.timeline.close(rss)
+        if not self._has_proc:
+            self.peak = max(self.peak, peak_rusage())
+        return self.peak
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Merge log files from many workers or hosts into one stream.
+
+Each file is read a record at a time, and records are merged in order of
+their timestamps with a heap holding one record per file, so memory use
+depends on the number of files and not on their size.  Each file must
+already be in time order, as the log files of a run are.
+"""
+
+# standard library imports
+import gzip
+import heapq
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+# global constants
+TEXT_TIME_RE = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?")
+JSON_TIME_RE = re.compile(r'"time": ?"([^"]+)"')
+
+
+def line_time(line):
+    """Return the timestamp of a log line, or None for a continuation.
+
+    Text-format times have no time zone and are taken as local time, and
+    JSON-format times carry their UTC offset.
+    """
+    if line.startswith("{"):
+        match = JSON_TIME_RE.search(line)
+        if match is None:
+            return None
+        stamp = match[1]
+    else:
+        match = TEXT_TIME_RE.match(line)
+        if match is None:
+            return None
+        stamp = match[0]
+    try:
+        return datetime.fromisoformat(stamp).timestamp()
+    except ValueError:
+        return None
+
+
+def read_records(path):
+    """Yield (timestamp, lines) of each record of a log file.
+
+    Lines without a timestamp, such as tracebacks and timing tables,
+    belong to the record before them.  Lines before the first timestamp
+    are a record that sorts before all others.
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        logfile = gzip.open(path, "rt", encoding="utf8", errors="replace")
+    else:
+        logfile = path.open(encoding="utf8", errors="replace")
+    with logfile:
+        timestamp, lines = float("-inf"), []
+        for line in logfile:
+            new_timestamp = line_time(line)
+            if new_timestamp is not None:
+                if lines:
+                    yield timestamp, lines
+                timestamp, lines = new_timestamp, []
+            lines.append(line if line.endswith("\n") else line + "\n")
+        if lines:
+            yield timestamp, lines
+
+
+def source_names(paths):
+    """Return a source name for each path: its name if unique, else path."""
+    names = [Path(path).name for path in paths]
+    if len(set(names)) == len(names):
+        return names
+    return [str(path) for path in paths]
+
+
+def _tagged_records(path, source):
+    """Yield (timestamp, source, lines) of each record of a log file."""
+    for timestamp, lines in read_records(path):
+        yield timestamp, source, lines
+
+
+def merge_logs(paths, sources=None):
+    """Yield (source, lines) of the records of log files in time order.
+
+    Records with the same timestamp keep the order of ``paths``.
+    ``sources`` defaults to ``source_names(paths)``.
+    """
+    if sources is None:
+        sources = source_names(paths)
+    streams = [
+        _tagged_records(path, source) for path, source in zip(paths, sources)
+    ]
+    for unused_timestamp, source, lines in heapq.merge(
+        *streams, key=lambda record: record[0]
+    ):
+        yield source, lines
+
+
+def tag_record(source, lines):
+    """Return the lines of a record tagged with its source.
+
+    A JSON record gets a leading ``source`` field, and each line of a
+    text record gets a ``SOURCE | `` prefix.
+    """
+    tagged = [f"{source} | {line}" for line in lines]
+    if lines[0].startswith("{"):
+        tagged[0] = '{"source":' + json.dumps(source) + "," + lines[0][1:]
+    return tagged
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""OpenMetrics textfile export of run timings and memory use."""
+
+# standard library imports
+import os
+import tempfile
+from pathlib import Path
+
+# module imports
+from .timers import flatten_timings
+
+# global constants
+METRIC_PREFIX = "click_loguru"
+METRICS_SUFFIX = ".prom"
+
+
+def _escape(value):
+    """Escape a label value."""
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(labels):
+    """Return labels in braces."""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+def format_metrics(labels, timings, exit_status, start_time, peak_rss=None):
+    """Return run metrics in the OpenMetrics text format.
+
+    ``timings`` is a timing tree as returned by ``TimerTree.as_dict``,
+    and each of its nodes is labelled with the path of phase names from
+    the root, e.g. ``Total/Load``.  ``labels`` are added to every sample.
+    """
+    families = []
+
+    def family(name, help_text, samples):
+        """Add a gauge family of (extra labels, value) samples."""
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines = [f"# TYPE {metric} gauge", f"# HELP {metric} {help_text}"]
+        for extra, value in samples:
+            lines.append(f"{metric}{_labels({**labels, **extra})} {value!r}")
+        families.append("\n".join(lines))
+
+    rows = list(flatten_timings(timings))
+    family(
+        "phase_wall_seconds",
+        "Wall-clock time spent in phase.",
+        [({"phase": row[0]}, float(row[1])) for row in rows],
+    )
+    family(
+        "phase_cpu_seconds",
+        "Process CPU time spent in phase.",
+        [({"phase": row[0]}, float(row[2])) for row in rows],
+    )
+    family(
+        "phase_calls",
+        "Number of times phase was timed.",
+        [({"phase": row[0]}, row[3]) for row in rows],
+    )
+    if peak_rss is not None:
+        family(
+            "peak_rss_bytes",
+            "Peak resident set size of process and children.",
+            [({}, int(peak_rss))],
+        )
+    family(
+        "exit_status",
+        "Exit status of the process, 0 for success.",
+        [({}, exit_status)],
+    )
+    family(
+        "start_time_seconds",
+        "Start time of run since the epoch.",
+        [({}, float(start_time))],
+    )
+    return "\n".join(families) + "\n# EOF\n"
+
+
+def write_metrics(text, path):
+    """Write metrics text so that readers never see a partial file.
+
+    The text goes to a hidden temporary file in the same directory,
+    which is then renamed over ``path``.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle, temp_name = tempfile.mkstemp(
+        prefix=f".{path.name}.", suffix=".tmp", dir=path.parent
+    )
+    try:
+        with os.fdopen(handle, "w") as temp_file:
+            temp_file.write(text)
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
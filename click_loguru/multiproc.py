@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Forward logging from worker processes to the parent process."""
+
+# standard library imports
+import functools
+import multiprocessing
+import os
+import threading
+import traceback
+
+# third-party imports
+from loguru import logger
+
+# global constants
+PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class QueueSink:
+    """Send log records from a worker process to a queue."""
+
+    def __init__(self, queue):
+        """Set the queue."""
+        self._queue = queue
+
+    def write(self, message):
+        """Put a picklable summary of the record on the queue."""
+        record = message.record
+        exception = record["exception"]
+        if exception is not None:
+            exception = "".join(traceback.format_exception(*exception))
+        self._queue.put(
+            (
+                os.getpid(),
+                record["level"].name,
+                record["message"],
+                record["name"],
+                record["function"],
+                record["line"],
+                record["time"],
+                {
+                    k: v if isinstance(v, PLAIN_TYPES) else str(v)
+                    for k, v in record["extra"].items()
+                },
+                exception,
+            )
+        )
+
+
+def _restore_fields(fields, record):
+    """Patch a record with fields from a worker's record."""
+    record.update(fields)
+
+
+def init_worker(queue, level):
+    """Replace a worker's log handlers with one that sends to the parent."""
+    logger.remove()
+    logger.add(QueueSink(queue), level=level, format="{message}")
+
+
+class WorkerLogging:
+    """Log from worker processes into the parent's sinks.
+
+    Pass ``initializer`` and ``initargs`` to ``multiprocessing.Pool`` or
+    ``concurrent.futures.ProcessPoolExecutor``.  Workers then send their
+    records over a queue to a thread in the parent, which logs them to the
+    parent's sinks with the worker's module, function, line, and time, and
+    the worker's pid in the message and in the ``worker_pid`` extra field.
+    Use as a context manager around the lifetime of the pool, so that all
+    records are logged before the listener stops.
+    """
+
+    def __init__(self, level="DEBUG", context=None):
+        """Create the queue for a multiprocessing context."""
+        if context is None:
+            context = multiprocessing.get_context()
+        self.queue = context.Queue()
+        self.initializer = init_worker
+        self.initargs = (self.queue, level)
+        self._thread = None
+
+    def _listen(self):
+        """Log records from workers until told to stop."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            pid, level, message, name, function, line, time, extra = item[:8]
+            exception = item[8]
+            if exception is not None:
+                message += "\n" + exception.rstrip()
+            fields = {
+                "name": name,
+                "function": function,
+                "line": line,
+                "time": time,
+            }
+            logger.patch(functools.partial(_restore_fields, fields)).bind(
+                worker_pid=pid, **extra
+            ).log(level, f"[pid {pid}] {message}")
+
+    def start(self):
+        """Start logging records from workers."""
+        self._thread = threading.Thread(
+            target=self._listen, name="worker log listener", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Log all records received and stop the listener."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        """Start the listener on entry to a with block."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Stop the listener on exit from a with block."""
+        self.stop()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Daemon threads that do a little work at a fixed interval.
+
+The CPU time used by these and the other daemon threads of click_loguru
+is recorded by each thread as it works, so that the stall watchdog can
+tell it apart from the progress of the command.
+"""
+
+# standard library imports
+import threading
+from time import thread_time
+
+# global constants
+_thread_cpu = {}  # CPU seconds used by each daemon thread, ended or not
+_thread_cpu_lock = threading.Lock()
+
+
+def record_thread_cpu():
+    """Record the CPU time used so far by the calling daemon thread."""
+    with _thread_cpu_lock:
+        _thread_cpu[threading.current_thread()] = thread_time()
+
+
+def daemon_cpu_time():
+    """Return the CPU seconds recorded by daemon threads of click_loguru."""
+    with _thread_cpu_lock:
+        return sum(_thread_cpu.values())
+
+
+class PeriodicThread:
+    """Call ``tick`` every ``tick_interval`` seconds from a daemon thread.
+
+    Subclasses define ``tick`` and extend ``start`` and ``stop`` with
+    their own setup and final work.  Used as a context manager, the
+    thread runs for the duration of a with block.
+    """
+
+    thread_name = "periodic"
+
+    def __init__(self, tick_interval):
+        """Set seconds between ticks."""
+        self._tick_interval = tick_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def tick(self):
+        """Do the periodic work."""
+        raise NotImplementedError
+
+    def _run(self):
+        """Tick until stopped."""
+        while not self._stop_event.wait(self._tick_interval):
+            record_thread_cpu()
+            self.tick()
+        record_thread_cpu()
+
+    def start(self):
+        """Start the thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=self.thread_name, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread, waiting for a tick in progress to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        """Start on entry to a with block."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Stop on exit from a with block."""
+        self.stop()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""CPU profiling for click_loguru."""
+
+# standard library imports
+import marshal
+import signal
+import threading
+from pathlib import Path
+
+# global constants
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_INTERVAL = 0.005  # seconds of CPU time between samples
+DEFAULT_N_FUNCTIONS = 20
+
+
+def _code_key(code):
+    """Return the pstats function key for a code object."""
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _label(func_key):
+    """Return a short label for a pstats function key."""
+    filename, line, name = func_key
+    if filename == "~":  # built-in function
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+class DeterministicProfiler:
+    """Profile every function call with cProfile."""
+
+    mode = "cprofile"
+
+    def __init__(self):
+        """Create the profiler."""
+        # deferred until profiling is requested
+        import cProfile
+
+        self._profiler = cProfile.Profile()
+
+    def start(self):
+        """Start profiling."""
+        self._profiler.enable()
+        return self
+
+    def stop(self):
+        """Stop profiling."""
+        self._profiler.disable()
+
+    def stats(self):
+        """Return profile statistics in pstats form."""
+        self._profiler.create_stats()
+        return self._profiler.stats
+
+    def collapsed(self):
+        """Return collapsed stacks, which cProfile does not record."""
+        return []
+
+    def __enter__(self):
+        """Start profiling on entry to a with block."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Stop profiling on exit from a with block."""
+        self.stop()
+
+
+class StackSampler:
+    """Sample the main-thread call stack on a CPU-time interval timer.
+
+    A SIGPROF handler records the interrupted stack every ``interval``
+    seconds of process CPU time, so the overhead is independent of how
+    many function calls are made.  Times in the statistics are sample
+    counts multiplied by the interval, and call counts are sample counts.
+    """
+
+    mode = "sample"
+
+    def __init__(self, interval=DEFAULT_PROFILE_INTERVAL):
+        """Set sampling interval in seconds of CPU time."""
+        self.interval = interval
+        self.n_samples = 0
+        self._stacks = {}
+        self._old_handler = None
+
+    def _handler(self, unused_signum, frame):
+        """Record the stack of the interrupted frame."""
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        stack = tuple(codes)
+        self._stacks[stack] = self._stacks.get(stack, 0) + 1
+        self.n_samples += 1
+
+    def start(self):
+        """Start sampling; must be called from the main thread."""
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError("stack sampling requires the main thread")
+        self._old_handler = signal.signal(signal.SIGPROF, self._handler)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self):
+        """Stop sampling."""
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._old_handler)
+
+    def stats(self):
+        """Return sampled statistics in pstats form."""
+        stats = {}
+        for codes, count in self._stacks.items():
+            funcs = [_code_key(c) for c in codes]  # innermost first
+            for depth, func in enumerate(funcs):
+                cc, nc, tt, ct, callers = stats.get(func, (0, 0, 0, 0, {}))
+                if depth == 0:
+                    tt += count
+                if func not in funcs[:depth]:  # count recursion once
+                    cc += count
+                    nc += count
+                    ct += count
+                if depth + 1 < len(funcs):
+                    caller = funcs[depth + 1]
+                    callers[caller] = callers.get(caller, 0) + count
+                stats[func] = (cc, nc, tt, ct, callers)
+        return {
+            func: (cc, nc, tt * self.interval, ct * self.interval, callers)
+            for func, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+    def collapsed(self):
+        """Return stacks as 'outer;...;inner count' lines."""
+        return [
+            ";".join(_label(_code_key(c)) for c in reversed(codes))
+            + f" {count}"
+            for codes, count in self._stacks.items()
+        ]
+
+    def __enter__(self):
+        """Start sampling on entry to a with block."""
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        """Stop sampling on exit from a with block."""
+        self.stop()
+
+
+def make_profiler(mode, interval=DEFAULT_PROFILE_INTERVAL):
+    """Return a profiler for a mode in PROFILE_MODES.
+
+    Sampling needs ``setitimer`` and the main thread, so without them a
+    cProfile profiler is returned instead; its ``mode`` is the one used.
+    """
+    if mode == "sample":
+        if (
+            hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        ):
+            return StackSampler(interval)
+        return DeterministicProfiler()
+    if mode == "cprofile":
+        return DeterministicProfiler()
+    raise ValueError(f"profile mode must be one of {PROFILE_MODES}")
+
+
+def write_stats(stats, path):
+    """Write statistics in a file readable by pstats.Stats."""
+    with Path(path).open("wb") as stats_file:
+        marshal.dump(stats, stats_file)
+
+
+def write_collapsed(lines, path):
+    """Write collapsed stacks for flame-graph tools."""
+    with Path(path).open("w") as collapsed_file:
+        collapsed_file.write("".join(line + "\n" for line in lines))
+
+
+def profile_summary(stats, n_functions=DEFAULT_N_FUNCTIONS):
+    """Return a table of the functions with the most self time."""
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+    lines = [f"{'Self (s)':>10} {'Total (s)':>10} {'Calls':>10}  Function"]
+    for func, (unused_cc, nc, tt, ct, unused_callers) in rows[:n_functions]:
+        lines.append(f"{tt:10.3f} {ct:10.3f} {nc:10d}  {_label(func)}")
+    return "\n".join(lines)
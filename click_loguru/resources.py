@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Resource usage counters from getrusage and /proc."""
+
+# standard library imports
+import sys
+from pathlib import Path
+
+# module imports
+from .memory import format_bytes
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+# global constants
+PROC_IO_PATH = Path("/proc/self/io")
+RUSAGE_FIELDS = {
+    "user": "ru_utime",
+    "system": "ru_stime",
+    "major_faults": "ru_majflt",
+    "minor_faults": "ru_minflt",
+    "voluntary_switches": "ru_nvcsw",
+    "involuntary_switches": "ru_nivcsw",
+    "block_in": "ru_inblock",
+    "block_out": "ru_oublock",
+}
+IO_FIELDS = ("read_bytes", "write_bytes")
+
+
+def proc_io():
+    """Return bytes read from and written to storage, if available.
+
+    The counts include children that have been waited for.
+    """
+    try:
+        text = PROC_IO_PATH.read_text()
+    except OSError:
+        return {}
+    usage = {}
+    for line in text.splitlines():
+        key, unused_sep, value = line.partition(":")
+        if key in IO_FIELDS:
+            usage[key] = int(value)
+    return usage
+
+
+def resource_usage():
+    """Return resource counters of this process and its children.
+
+    Counters are summed over this process and its waited-for children,
+    except ``max_rss`` (bytes), which is the larger of the two peaks.
+    """
+    usage = {}
+    if resource is not None:
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        for key, field in RUSAGE_FIELDS.items():
+            usage[key] = getattr(own, field) + getattr(children, field)
+        scale = 1 if sys.platform == "darwin" else 1024  # macOS reports bytes
+        usage["max_rss"] = scale * max(own.ru_maxrss, children.ru_maxrss)
+    usage.update(proc_io())
+    return usage
+
+
+def usage_delta(start, end):
+    """Return the change in counters between two ``resource_usage`` calls.
+
+    ``max_rss`` is a high-water mark rather than a counter, so it is
+    taken from ``end`` as is.
+    """
+    delta = {key: value - start.get(key, 0) for key, value in end.items()}
+    if "max_rss" in end:
+        delta["max_rss"] = end["max_rss"]
+    return delta
+
+
+def format_usage(usage):
+    """Return resource counters as a one-line summary."""
+    parts = []
+    if "user" in usage:
+        parts.append(
+            f"{usage['user']:.1f} s user, {usage['system']:.1f} s system CPU"
+        )
+    if "max_rss" in usage:
+        parts.append(f"max RSS {format_bytes(usage['max_rss'])}")
+    if "major_faults" in usage:
+        parts += [
+            f"page faults {usage['major_faults']:,} major"
+            + f" {usage['minor_faults']:,} minor",
+            f"context switches {usage['voluntary_switches']:,} voluntary"
+            + f" {usage['involuntary_switches']:,} involuntary",
+            f"block I/O {usage['block_in']:,} in {usage['block_out']:,} out",
+        ]
+    if "read_bytes" in usage:
+        parts.append(
+            f"read {format_bytes(usage['read_bytes'])},"
+            + f" written {format_bytes(usage['write_bytes'])}"
+        )
+    return ", ".join(parts)
@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""Log-file sinks for click_loguru."""
+
+# standard library imports
+import collections
+import gzip
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import traceback
+import weakref
+from pathlib import Path
+
+# module imports
+from .periodic import record_thread_cpu
+
+# global constants
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BUFFER_SIZE = 65536  # characters
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+WRITER_CHECK_INTERVAL = 1.0  # seconds between checks that a writer lives
+STOP_TIMEOUT = 10.0  # seconds to wait for a writer to drain at stop
+FLUSH_SIGNALS = ("SIGTERM", "SIGHUP")
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_debug")
+LOGFILE_FORMATS = ("text", "json")
+DEBUG_LEVEL_NO = 10
+INFO_LEVEL_NO = 20
+WARNING_LEVEL_NO = 30
+ERROR_LEVEL_NO = 40
+_STOP = object()  # sentinel that tells the writer thread to exit
+_signal_sinks = weakref.WeakSet()  # buffered sinks to flush on signals
+
+
+def open_logfile(path, compress=False, encoding="utf8", buffering=-1):
+    """Open a log file for appending text, creating its directory."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        return gzip.open(path, "at", encoding=encoding)
+    return path.open("a", encoding=encoding, buffering=buffering)
+
+
+class JsonFormatter:
+    """Render each loguru record as one JSON line.
+
+    Fields that are the same for every record, such as the program name
+    and subcommand, are encoded once.  Each line then adds the timestamp,
+    level, module, function, line, current phase, message, any bound
+    extras, and the exception if there is one.
+    """
+
+    def __init__(self, static_fields, get_phase=None):
+        """Pre-encode static fields and set a function returning phase."""
+        self._encode = json.JSONEncoder(
+            separators=(",", ":"), ensure_ascii=False, default=str
+        ).encode
+        self._prefix = self._encode(static_fields)[:-1]
+        if static_fields:
+            self._prefix += ","
+        self._get_phase = get_phase
+
+    def serialize(self, record):
+        """Return a record as a JSON string."""
+        fields = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "module": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "phase": self._get_phase() if self._get_phase else None,
+            "message": record["message"],
+        }
+        for key, value in record["extra"].items():
+            fields[key] = value
+        if record["exception"] is not None:
+            fields["exception"] = "".join(
+                traceback.format_exception(*record["exception"])
+            )
+        return self._prefix + self._encode(fields)[1:]
+
+
+class _Message(str):
+    """A formatted message that keeps its loguru record."""
+
+    __slots__ = ("record",)
+
+
+class JsonSink:
+    """Write messages to an inner sink or stream as JSON lines.
+
+    Each record is serialized by ``formatter`` in the logging thread, so
+    that the current phase is that of the thread or task that logged it,
+    and passed on with its record to ``inner``.  The record itself is not
+    changed, so other handlers see it as logged.
+    """
+
+    def __init__(self, inner, formatter):
+        """Set inner sink and JsonFormatter."""
+        self._inner = inner
+        self._serialize = formatter.serialize
+
+    def write(self, message):
+        """Write the JSON line of a message's record."""
+        line = _Message(self._serialize(message.record) + "\n")
+        line.record = message.record
+        self._inner.write(line)
+
+    def stop(self):
+        """Stop or close the inner sink."""
+        if hasattr(self._inner, "stop"):
+            self._inner.stop()
+        else:
+            self._inner.close()
+
+
+class CompressedFileSink:
+    """Write log messages to a gzip-compressed file.
+
+    The stream is not flushed after each message, which would ruin the
+    compression, so the file is only complete after the sink is stopped.
+    Forked child processes leave the file for the parent to close.
+    """
+
+    def __init__(self, path, encoding="utf8"):
+        """Open the file."""
+        self.path = Path(path)
+        self.encoding = encoding
+        self._pid = os.getpid()
+        self._file = open_logfile(path, compress=True, encoding=encoding)
+
+    def write(self, message):
+        """Write a formatted message."""
+        self._file.write(message)
+
+    def stop(self):
+        """Close the file."""
+        if os.getpid() == self._pid:
+            self._file.close()
+
+
+def _flush_and_resignal(signum, frame):
+    """Flush buffered sinks, then let the previous handler take over."""
+    for sink in list(_signal_sinks):
+        if sink._pid == os.getpid():  # pylint: disable=protected-access
+            sink.flush_buffer()
+    previous = _flush_and_resignal.previous.get(signum, signal.SIG_DFL)
+    if callable(previous):
+        previous(signum, frame)
+    elif previous != signal.SIG_IGN:
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+_flush_and_resignal.previous = {}
+
+
+def _flush_on_signals(sink):
+    """Flush a sink when the process is told to terminate or hang up.
+
+    Handlers can only be installed from the main thread; elsewhere, the
+    sink is flushed only by its own triggers and at exit.
+    """
+    _signal_sinks.add(sink)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for name in FLUSH_SIGNALS:
+        signum = getattr(signal, name, None)
+        if signum is None or signum in _flush_and_resignal.previous:
+            continue
+        _flush_and_resignal.previous[signum] = signal.signal(
+            signum, _flush_and_resignal
+        )
+
+
+class BufferedFileSink:
+    """Write log messages to a file in large, infrequent writes.
+
+    Messages are collected in memory and written out together when they
+    add up to ``buffer_size`` characters, when a message at
+    ``flush_level`` (WARNING by default) or above arrives, and at least
+    every ``flush_interval`` seconds by a daemon thread.  The buffer is
+    also written when the sink is stopped, which loguru does at exit, and
+    on SIGTERM or SIGHUP.  Forked child processes leave the file for the
+    parent.
+    """
+
+    def __init__(
+        self,
+        path,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        flush_level=WARNING_LEVEL_NO,
+        encoding="utf8",
+    ):
+        """Open the file, start the flush thread, and catch signals."""
+        self.path = Path(path)
+        self.encoding = encoding
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._flush_level = flush_level
+        self._buffer = []
+        self._size = 0
+        self._pid = os.getpid()
+        self._file = open_logfile(path, encoding=encoding)
+        self._lock = threading.RLock()  # signal handlers may re-enter
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._flusher, name=f"log flusher {self.path}", daemon=True
+        )
+        self._thread.start()
+        _flush_on_signals(self)
+
+    def write(self, message):
+        """Buffer a formatted message, flushing if a trigger is reached."""
+        with self._lock:
+            self._buffer.append(message)
+            self._size += len(message)
+            if (
+                self._size >= self._buffer_size
+                or message.record["level"].no >= self._flush_level
+            ):
+                self.flush_buffer()
+
+    def flush_buffer(self):
+        """Write all buffered messages to the file.
+
+        This is not named ``flush``, which loguru calls after every message.
+        """
+        with self._lock:
+            if not self._buffer or self._file.closed:
+                return
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            self._buffer.clear()
+            self._size = 0
+
+    def _flusher(self):
+        """Flush at least once per flush interval until stopped."""
+        while not self._stopping.wait(self._flush_interval):
+            self.flush_buffer()
+            record_thread_cpu()
+
+    def stop(self):
+        """Flush all buffered messages and close the file."""
+        if os.getpid() != self._pid:
+            return
+        self._stopping.set()
+        self._thread.join()
+        with self._lock:
+            self.flush_buffer()
+            self._file.close()
+        _signal_sinks.discard(self)
+
+
+class RingBufferSink:
+    """Keep low-level messages in memory, writing them only on failure.
+
+    Messages below ``buffer_below`` (INFO by default) go into a ring
+    buffer holding the last ``capacity`` of them, and other messages go
+    to the ``inner`` sink or stream.  A message at ``dump_at`` (ERROR by
+    default) or above first writes out the buffered messages, as does a
+    call to ``dump``.  Buffered messages are discarded on a clean exit.
+    """
+
+    def __init__(
+        self,
+        inner,
+        capacity,
+        buffer_below=INFO_LEVEL_NO,
+        dump_at=ERROR_LEVEL_NO,
+    ):
+        """Set inner sink, buffer size, and level numbers."""
+        self._inner = inner
+        self._buffer = collections.deque(maxlen=capacity)
+        self._buffer_below = buffer_below
+        self._dump_at = dump_at
+        self._lock = threading.Lock()
+
+    def write(self, message):
+        """Buffer or write a formatted message."""
+        level_no = message.record["level"].no
+        if level_no < self._buffer_below:
+            # under the lock, so a dump in another thread can't lose it
+            with self._lock:
+                self._buffer.append(message)
+            return
+        if level_no >= self._dump_at:
+            self.dump()
+        self._inner.write(message)
+
+    def dump(self):
+        """Write and clear all buffered messages."""
+        with self._lock:
+            messages = list(self._buffer)
+            self._buffer.clear()
+        for message in messages:
+            self._inner.write(message)
+
+    def stop(self):
+        """Stop or close the inner sink."""
+        if hasattr(self._inner, "stop"):
+            self._inner.stop()
+        else:
+            self._inner.close()
+
+
+class AsyncFileSink:
+    """Write log messages to a file from a background thread.
+
+    Messages are put on a bounded queue and written in batches by a
+    daemon thread.  When the queue is full, the ``overflow`` policy decides
+    what happens:
+
+    * ``block`` waits for room in the queue (no messages are lost),
+    * ``drop_oldest`` discards the oldest queued message,
+    * ``drop_debug`` discards messages at DEBUG level and below, and
+      blocks for anything more severe.
+
+    A failed write does not stop the writer: its messages are counted in
+    ``lost``, the first error is reported on stderr, and the queue keeps
+    draining so that logging never waits on a broken file.  The queue is
+    drained and the file closed when loguru removes the handler, which it
+    does for all handlers at interpreter exit, waiting at most
+    ``STOP_TIMEOUT`` seconds for a writer stuck in a write.  Forked child
+    processes leave both for the parent.
+    """
+
+    def __init__(
+        self,
+        path,
+        queue_size=DEFAULT_QUEUE_SIZE,
+        overflow="block",
+        encoding="utf8",
+        compress=False,
+    ):
+        """Open the file and start the writer thread."""
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {OVERFLOW_POLICIES}, not {overflow}"
+            )
+        self.path = Path(path)
+        self.encoding = encoding
+        self.dropped = 0
+        self.lost = 0
+        self._overflow = overflow
+        self._pid = os.getpid()
+        self._file = open_logfile(path, compress=compress, encoding=encoding)
+        # flushing a compressed stream ends a deflate block, so only flush
+        # a plain file after each batch
+        self._flush_batches = not compress
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._writer, name=f"log writer {self.path}", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, message):
+        """Queue a formatted message for writing."""
+        try:
+            self._queue.put_nowait(message)
+            return
+        except queue.Full:
+            pass
+        if self._overflow == "block":
+            self._put(message)
+        elif self._overflow == "drop_debug":
+            if message.record["level"].no <= DEBUG_LEVEL_NO:
+                self.dropped += 1
+            else:
+                self._put(message)
+        else:  # drop_oldest
+            while True:
+                try:
+                    self._queue.put_nowait(message)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def _put(self, message):
+        """Wait for room in the queue, unless the writer has died."""
+        while True:
+            try:
+                self._queue.put(message, timeout=WRITER_CHECK_INTERVAL)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    self.lost += 1
+                    return
+
+    def _write_failed(self, error, n_messages):
+        """Count lost messages and report the first write error."""
+        if not self.lost:
+            print(
+                f"Error writing log file {self.path}: {error}",
+                file=sys.stderr,
+            )
+        self.lost += n_messages
+
+    def _writer(self):
+        """Drain the queue to the file, one batch at a time."""
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        while True:
+            message = get()
+            batch = []
+            while message is not _STOP:
+                batch.append(message)
+                try:
+                    message = get_nowait()
+                except queue.Empty:
+                    message = None
+                    break
+            try:
+                self._file.write("".join(batch))
+                if self._flush_batches:
+                    self._file.flush()
+            except Exception as error:  # pylint: disable=broad-except
+                self._write_failed(error, len(batch))
+            record_thread_cpu()
+            if message is _STOP:
+                return
+
+    def stop(self):
+        """Flush all queued messages and close the file."""
+        if os.getpid() != self._pid:
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=STOP_TIMEOUT)
+            except queue.Full:
+                pass
+            self._thread.join(STOP_TIMEOUT)
+            if self._thread.is_alive():
+                # stuck in a write, so leave the file to the writer
+                return
+        if self.lost:
+            print(
+                f"{self.lost} log messages lost writing {self.path}",
+                file=sys.stderr,
+            )
+        try:
+            if self.dropped:
+                self._file.write(
+                    f"{self.dropped} log messages dropped by full queue\n"
+                )
+            self._file.close()
+        except OSError:
+            pass
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""Memory timelines: timestamped RSS samples with phase markers.
+
+Render a timeline file as a sparkline or as CSV with::
+
+    python -m click_loguru.timeline logs/NAME_n.memtl [--csv]
+"""
+
+# standard library imports
+import struct
+import threading
+from time import monotonic
+from time import time
+
+# third-party imports
+import click
+
+# module imports
+from .memory import format_bytes
+
+# global constants
+MAGIC = b"CLMEMTL1"
+HEADER = struct.Struct("<8sd")  # magic, wall-clock start time
+RECORD = struct.Struct("<dq")  # seconds since start, RSS or marker
+DEFAULT_MAX_INTERVAL = 1.0  # seconds between records of unchanging RSS
+DEFAULT_MIN_CHANGE = 0.01  # fraction of RSS that is worth a record
+DEFAULT_WIDTH = 72
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class MemoryTimeline:
+    """Write RSS samples and phase markers to a compact binary file.
+
+    A sample is recorded only if RSS has changed by more than
+    ``min_change`` of its last recorded value, or ``max_interval``
+    seconds have passed since the last record, so the time between
+    records adapts from the sampling interval up to ``max_interval``.
+    Each record is 16 bytes: the time in seconds since the start and the
+    RSS in bytes, or, for a phase marker, minus one minus the length of
+    the UTF-8 phase name that follows.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_interval=DEFAULT_MAX_INTERVAL,
+        min_change=DEFAULT_MIN_CHANGE,
+    ):
+        """Create the file and write its header."""
+        self.path = path
+        self._max_interval = max_interval
+        self._min_change = min_change
+        self._start = monotonic()
+        self._last_time = None
+        self._last_rss = None
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open("wb")
+        self._file.write(HEADER.pack(MAGIC, time()))
+
+    def sample(self, rss, force=False):
+        """Record an RSS sample in bytes if it is worth recording."""
+        now = monotonic() - self._start
+        with self._lock:
+            if self._file.closed:
+                return
+            last_rss = self._last_rss
+            if not (
+                force
+                or last_rss is None
+                or now - self._last_time >= self._max_interval
+                or abs(rss - last_rss) > self._min_change * last_rss
+            ):
+                return
+            self._file.write(RECORD.pack(now, rss))
+            self._last_time = now
+            self._last_rss = rss
+
+    def mark(self, phase):
+        """Record the start of a phase, or the end of phases for None."""
+        name = (phase or "").encode("utf8")
+        now = monotonic() - self._start
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(RECORD.pack(now, -1 - len(name)) + name)
+
+    def close(self, rss=None):
+        """Record a final sample and close the file."""
+        if rss is not None:
+            self.sample(rss, force=True)
+        with self._lock:
+            self._file.close()
+
+
+def read_timeline(path):
+    """Return the start time, samples, and phase markers of a timeline.
+
+    Samples are (seconds, RSS bytes) pairs and markers are (seconds,
+    phase) pairs, with phase None for the end of phases.
+    """
+    samples = []
+    markers = []
+    with open(path, "rb") as timeline:
+        magic, start = HEADER.unpack(timeline.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a memory timeline")
+        while True:
+            record = timeline.read(RECORD.size)
+            if len(record) < RECORD.size:
+                break
+            seconds, value = RECORD.unpack(record)
+            if value >= 0:
+                samples.append((seconds, value))
+            else:
+                name = timeline.read(-1 - value).decode("utf8")
+                markers.append((seconds, name or None))
+    return start, samples, markers
+
+
+def sparkline(samples, markers, width=DEFAULT_WIDTH):
+    """Return a sparkline of peak RSS over time with a row of markers.
+
+    Each column shows the highest sample in its time slice, on a scale
+    from zero to the overall peak.  Phase starts are numbered under the
+    sparkline and listed after it.
+    """
+    if not samples:
+        return "no samples"
+    duration = max(samples[-1][0], markers[-1][0] if markers else 0.0)
+    slice_width = duration / width if duration > 0 else 1.0
+    columns = [None] * width
+    for seconds, rss in samples:
+        column = min(int(seconds / slice_width), width - 1)
+        if columns[column] is None or rss > columns[column]:
+            columns[column] = rss
+    peak = max(rss for unused_seconds, rss in samples)
+    last = 0
+    chars = []
+    for rss in columns:
+        if rss is None:
+            rss = last  # RSS did not change enough to be recorded
+        last = rss
+        level = int(rss / peak * (len(SPARK_CHARS) - 1)) if peak else 0
+        chars.append(SPARK_CHARS[level])
+    marker_row = [" "] * width
+    legend = []
+    for number, (seconds, name) in enumerate(
+        [m for m in markers if m[1] is not None], start=1
+    ):
+        column = min(int(seconds / slice_width), width - 1)
+        marker_row[column] = str(number % 10)
+        legend.append(f"{number % 10} {seconds:.2f} s {name}")
+    lines = [
+        f"peak {format_bytes(peak)} over {duration:.2f} s",
+        "".join(chars),
+        "".join(marker_row).rstrip(),
+    ]
+    return "\n".join(lines + legend)
+
+
+def timeline_csv(samples, markers):
+    """Return samples as CSV rows of seconds, RSS bytes, and phase."""
+    rows = ["seconds,rss_bytes,phase"]
+    marker_index = 0
+    phase = ""
+    for seconds, rss in samples:
+        while (
+            marker_index < len(markers)
+            and markers[marker_index][0] <= seconds
+        ):
+            phase = markers[marker_index][1] or ""
+            marker_index += 1
+        rows.append(f"{seconds:.6f},{rss},{phase}")
+    return "\n".join(rows) + "\n"
+
+
+@click.command()
+@click.argument(
+    "timeline_path", type=click.Path(exists=True, dir_okay=False)
+)
+@click.option("--csv", "as_csv", is_flag=True, help="Write CSV instead.")
+@click.option(
+    "--width",
+    type=click.IntRange(min=1),
+    default=DEFAULT_WIDTH,
+    show_default=True,
+    help="Width of sparkline in characters.",
+)
+def main(timeline_path, as_csv, width):
+    """Show a memory timeline as a sparkline or CSV."""
+    try:
+        unused_start, samples, markers = read_timeline(timeline_path)
+    except (ValueError, struct.error) as error:
+        raise click.ClickException(str(error)) from None
+    if as_csv:
+        click.echo(timeline_csv(samples, markers), nl=False)
+    else:
+        click.echo(sparkline(samples, markers, width))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()  # pylint: disable=no-value-for-parameter
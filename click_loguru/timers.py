@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""Hierarchical phase timers for click_loguru."""
+
+# standard library imports
+import contextlib
+import contextvars
+import functools
+import threading
+from time import perf_counter
+from time import perf_counter_ns
+from time import process_time
+
+# global constants
+SUB_BUCKET_BITS = 7  # percentile sketch relative error is below 2**-6
+PERCENTILES = (50, 95, 99)
+
+
+def format_seconds(seconds):
+    """Return seconds as an H:MM:SS string."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class TimerNode:
+    """Accumulated times for one node of a timing tree."""
+
+    __slots__ = ("name", "wall", "cpu", "calls", "children")
+
+    def __init__(self, name):
+        """Start with no time recorded."""
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+        self.children = {}
+
+    def child(self, name):
+        """Return the named child node, creating it if needed."""
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = TimerNode(name)
+        return node
+
+    def as_dict(self):
+        """Return this node and its descendants as nested dicts."""
+        return {
+            "name": self.name,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "calls": self.calls,
+            "children": [c.as_dict() for c in self.children.values()],
+        }
+
+
+class TimerTree:
+    """Build a tree of wall and CPU times from nested timers.
+
+    The stack of running timers is kept in a context variable, so each
+    thread and each asyncio task nests its own timers.  A task starts
+    inside the timers that were running where it was created, while a
+    new thread starts at the root.  Times from all of them accumulate in
+    the one tree.
+    """
+
+    def __init__(self, name="Total"):
+        """Start timing the root node."""
+        self._name = name
+        self._lock = threading.Lock()
+        self._stack = contextvars.ContextVar(
+            f"timer_stack_{id(self)}", default=(None, ())
+        )
+        self.reset()
+
+    def reset(self):
+        """Discard all times and restart timing the root node."""
+        self.root = TimerNode(self._name)
+        self._root_start = (perf_counter(), process_time())
+
+    def _frames(self):
+        """Return the running timers of this context, innermost last."""
+        root, frames = self._stack.get()
+        if root is not self.root:  # left over from before a reset
+            return ()
+        return frames
+
+    def start(self, name):
+        """Start a timer nested in the innermost running one.
+
+        Returns a token to be passed to ``stop``.
+        """
+        frames = self._frames()
+        parent = frames[-1][0] if frames else self.root
+        with self._lock:
+            node = parent.child(name)
+        frame = (node, perf_counter(), process_time())
+        self._stack.set((self.root, frames + (frame,)))
+        return frame
+
+    def innermost(self, name):
+        """Return the token of the innermost running timer of a name."""
+        for frame in reversed(self._frames()):
+            if frame[0].name == name:
+                return frame
+        return None
+
+    def stop(self, token):
+        """Stop a timer, along with any timers still running inside it."""
+        frames = self._frames()
+        if token not in frames:
+            return
+        wall, cpu = perf_counter(), process_time()
+        with self._lock:
+            while True:
+                frame = frames[-1]
+                frames = frames[:-1]
+                node, wall_start, cpu_start = frame
+                node.wall += wall - wall_start
+                node.cpu += cpu - cpu_start
+                node.calls += 1
+                if frame is token:
+                    break
+        self._stack.set((self.root, frames))
+
+    def _update_root(self):
+        """Set root node times to the time since the tree was created."""
+        self.root.wall = perf_counter() - self._root_start[0]
+        self.root.cpu = process_time() - self._root_start[1]
+        self.root.calls = 1
+
+    def as_dict(self):
+        """Return the timing tree as nested dicts."""
+        self._update_root()
+        return self.root.as_dict()
+
+    def report(self):
+        """Return the timing tree as an indented table."""
+        self._update_root()
+        rows = []
+
+        def add_rows(node, depth):
+            rows.append(("  " * depth + node.name, node))
+            for child in node.children.values():
+                add_rows(child, depth + 1)
+
+        add_rows(self.root, 0)
+        name_width = max(len("Phase"), max(len(r[0]) for r in rows))
+        total = self.root.wall or 1.0
+        lines = [
+            f"{'Phase':<{name_width}} {'Wall (s)':>10} {'CPU (s)':>10}"
+            + f" {'% total':>7} {'Calls':>7}"
+        ]
+        for label, node in rows:
+            lines.append(
+                f"{label:<{name_width}} {node.wall:10.2f} {node.cpu:10.2f}"
+                + f" {100.0 * node.wall / total:7.1f} {node.calls:7d}"
+            )
+        return "\n".join(lines)
+
+
+def flatten_timings(timings, path=()):
+    """Yield (phase path, wall, CPU, calls) for each node of a timing dict.
+
+    Paths join the names from the root with slashes, e.g. ``Total/Load``.
+    """
+    path = path + (timings["name"],)
+    yield "/".join(path), timings["wall"], timings["cpu"], timings["calls"]
+    for child in timings["children"]:
+        yield from flatten_timings(child, path)
+
+
+class PhaseTimer(contextlib.ContextDecorator):
+    """Time a block or function as a node of a timing tree."""
+
+    def __init__(self, tree, name):
+        """Set the tree and node name."""
+        self._tree = tree
+        self._name = name
+
+    def __enter__(self):
+        """Start the timer."""
+        self._tree.start(self._name)
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the timer."""
+        self._tree.stop(self._tree.innermost(self._name))
+        return False
+
+
+class HotTimer:
+    """Aggregate many short timings cheaply.
+
+    Each timing adds to a count, total, minimum, and maximum, and to a
+    log-bucketed histogram from which percentiles are estimated.  Use
+    ``record`` with a duration from ``perf_counter_ns``, or use the timer
+    as a decorator or context manager.
+    """
+
+    __slots__ = ("name", "count", "total", "min", "max", "_buckets", "_starts")
+
+    def __init__(self, name):
+        """Start with no timings."""
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        """Discard all timings."""
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._buckets = {}
+        self._starts = []
+
+    def record(self, duration_ns):
+        """Add one duration in nanoseconds."""
+        self.count += 1
+        self.total += duration_ns
+        if duration_ns > self.max:
+            self.max = duration_ns
+        if self.min is None or duration_ns < self.min:
+            self.min = duration_ns
+        shift = duration_ns.bit_length() - SUB_BUCKET_BITS
+        if shift > 0:
+            key = (shift << SUB_BUCKET_BITS) | (duration_ns >> shift)
+        else:
+            key = duration_ns
+        buckets = self._buckets
+        buckets[key] = buckets.get(key, 0) + 1
+
+    def percentile(self, percent):
+        """Return an estimate of a percentile in nanoseconds."""
+        if not self.count:
+            return 0
+        rank = percent * self.count / 100.0
+        seen = 0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen >= rank:
+                break
+        shift = key >> SUB_BUCKET_BITS
+        if shift == 0:
+            return key
+        mantissa = key & ((1 << SUB_BUCKET_BITS) - 1)
+        value = (mantissa << shift) + (1 << (shift - 1))
+        return min(max(value, self.min), self.max)
+
+    def as_dict(self):
+        """Return summary statistics in nanoseconds."""
+        stats = {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min or 0,
+            "max": self.max,
+        }
+        for percent in PERCENTILES:
+            stats[f"p{percent}"] = self.percentile(percent)
+        return stats
+
+    def __call__(self, func):
+        """Time every call of a function."""
+        record = self.record
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(perf_counter_ns() - start)
+
+        return wrapper
+
+    def __enter__(self):
+        """Start timing a block."""
+        self._starts.append(perf_counter_ns())
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop timing a block."""
+        self.record(perf_counter_ns() - self._starts.pop())
+        return False
+
+
+def hot_timer_report(hot_timers):
+    """Return a table of hot-timer statistics in microseconds."""
+    name_width = max([len("Timer")] + [len(t.name) for t in hot_timers])
+    columns = ["Count", "Total (s)", "Mean (us)", "Min (us)"]
+    columns += [f"p{p} (us)" for p in PERCENTILES] + ["Max (us)"]
+    header = f"{'Timer':<{name_width}}" + "".join(f" {c:>10}" for c in columns)
+    lines = [header]
+    for timer in hot_timers:
+        stats = timer.as_dict()
+        values = [stats["min"]] + [stats[f"p{p}"] for p in PERCENTILES]
+        values.append(stats["max"])
+        lines.append(
+            f"{timer.name:<{name_width}} {timer.count:10d}"
+            + f" {timer.total / 1e9:10.3f}"
+            + f" {timer.total / max(timer.count, 1) / 1e3:10.2f}"
+            + "".join(f" {v / 1e3:10.2f}" for v in values)
+        )
+    return "\n".join(lines)
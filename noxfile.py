@@ -46,3 +46,10 @@ def lint_pylint(session):
     session.run("poetry", "install", "--no-dev", external=True)
     install_with_constraints(session, "pylint", "nox")
     session.run("pylint", *args)
+
+
+@nox.session(python=["3.8"])
+def benchmarks(session):
+    """Run instrumentation-overhead benchmarks."""
+    session.run("poetry", "install", "--no-dev", external=True)
+    session.run("python", "-m", "tests.benchmarks", *session.posargs)
@@ -2,6 +2,11 @@
 """An extremely simple command-line application."""
 # standard library imports
 import array
+import asyncio
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 
 # third-party imports
@@ -13,6 +18,7 @@ from click_loguru import ClickLoguru
 
 # self imports
 from .other_module import other_module_levels
+from .other_module import worker_levels
 
 # global constants
 LOG_FILE_RETENTION = 3
@@ -90,6 +96,24 @@ def show_context():
     print(f"{state}")
 
 
+@cli.command()
+@click_loguru.init_logger()
+def log_from_workers():
+    """Log from worker processes."""
+    context = multiprocessing.get_context("spawn")
+    with click_loguru.worker_logging(context=context) as worker_logging:
+        with ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=context,
+            initializer=worker_logging.initializer,
+            initargs=worker_logging.initargs,
+        ) as pool:
+            pids = set(pool.map(worker_levels, range(4)))
+    state = click_loguru.get_global_options()
+    print(f"worker pids: {' '.join(str(pid) for pid in sorted(pids))}")
+    print(f"logfile_path: {state.logfile_path}")
+
+
 @cli.command()
 @click_loguru.init_logger(logfile=False)
 def quiet_value():
@@ -118,6 +142,134 @@ def log_elapsed_time():
     click_loguru.elapsed_time(None)
 
 
+@click_loguru.timer("step")
+def timed_step():
+    """Sleep briefly in a timed function."""
+    sleep(0.01)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_elapsed_time(level="info")
+def log_timing_tree():
+    """Log a tree of nested timers."""
+    click_loguru.elapsed_time("setup")
+    with click_loguru.timer("loop"):
+        for unused_i in range(3):
+            timed_step()
+    click_loguru.elapsed_time(None)
+
+
+def threaded_stage(stage):
+    """Run two phases in a worker thread."""
+    click_loguru.elapsed_time(f"{stage} load")
+    sleep(0.05 * (stage + 1))
+    click_loguru.elapsed_time(f"{stage} save")
+    sleep(0.05)
+    click_loguru.elapsed_time(None)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_elapsed_time(level="info")
+def log_threaded_phases():
+    """Log phases of concurrent threads."""
+    click_loguru.elapsed_time("main")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(threaded_stage, range(2)))
+    click_loguru.elapsed_time(None)
+
+
+async def download(number):
+    """Time an I/O-bound phase in an asyncio task."""
+    click_loguru.elapsed_time(f"download {number}")
+    await asyncio.sleep(0.1)
+    logger.debug(f"downloaded {number}")
+    click_loguru.elapsed_time(None)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_elapsed_time(level="info")
+@click_loguru.log_peak_memory_use(level="info")
+async def log_async():
+    """Log phases of concurrent asyncio tasks."""
+    await asyncio.gather(download(0), download(1))
+    state = click_loguru.get_global_options()
+    print(f"logfile_path: {state.logfile_path}")
+
+
+async def child_phase():
+    """Time a phase of a task started inside another phase."""
+    click_loguru.elapsed_time("child")
+    await asyncio.sleep(0.05)
+    click_loguru.elapsed_time(None)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_elapsed_time(level="info")
+async def log_nested_task():
+    """Log a phase that awaits a task with its own phase."""
+    click_loguru.elapsed_time("main")
+    await asyncio.create_task(child_phase())
+    click_loguru.elapsed_time(None)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click.argument("count", type=int)
+def log_many(count):
+    """Log many DEBUG messages."""
+    for i in range(count):
+        logger.debug(f"message {i}")
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click.argument("count", type=int)
+def elapsed_time_calls(count):
+    """Start many elapsed_time phases."""
+    for i in range(count):
+        click_loguru.elapsed_time(f"phase {i % 10}")
+    click_loguru.elapsed_time(None)
+
+
+@click_loguru.hot_timer("record")
+def process_record(record):
+    """Do a tiny amount of work in a hot-timed function."""
+    return record * 2
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_elapsed_time(level="info")
+def log_hot_timers():
+    """Log statistics of hot-loop timers."""
+    for record in range(1000):
+        process_record(record)
+    with click_loguru.hot_timer("block"):
+        sleep(0.01)
+
+
+def busy_loop(n_iterations):
+    """Use some CPU time."""
+    total = 0
+    for i in range(n_iterations):
+        total += i * i
+    return total
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_cpu_profile(level="info", n_functions=5)
+def log_cpu_profile():
+    """Log a CPU profile."""
+    busy_loop(3000000)
+    state = click_loguru.get_global_options()
+    print(f"logfile_path: {state.logfile_path}")
+
+
 @cli.command()
 @click_loguru.init_logger()
 @click_loguru.log_peak_memory_use(level="info")
@@ -127,3 +279,135 @@ def log_memory_use(alloc_size):
     arr = array.array("b")
     for unused_i in range(alloc_size * 1024 * 1024):
         arr.append(0)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_peak_memory_use(level="info")
+@click.argument("alloc_size", type=int)
+def log_phase_memory(alloc_size):
+    """Log memory use by phase."""
+    allocate_and_free(click_loguru, alloc_size)
+
+
+def allocate_and_free(instance, alloc_size):
+    """Allocate and free a block in two phases."""
+    instance.elapsed_time("allocate")
+    arr = bytearray(alloc_size * 1024 * 1024)
+    instance.elapsed_time("free")
+    del arr
+    instance.elapsed_time(None)
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_resource_usage(level="info")
+def log_resource_usage():
+    """Log resource usage by phase."""
+    click_loguru.elapsed_time("compute")
+    busy_loop(300000)
+    click_loguru.elapsed_time("sleep")
+    sleep(0.1)
+    click_loguru.elapsed_time(None)
+
+
+def allocate_blocks(n_blocks):
+    """Allocate a list of 1 MB blocks."""
+    return [bytearray(1024 * 1024) for unused_i in range(n_blocks)]
+
+
+@cli.command()
+@click_loguru.init_logger()
+@click_loguru.log_allocations(level="info", n_sites=3)
+def log_allocations():
+    """Log allocation sites by phase."""
+    click_loguru.elapsed_time("allocate")
+    blocks = allocate_blocks(20)
+    click_loguru.elapsed_time("free")
+    del blocks
+    click_loguru.elapsed_time(None)
+
+
+def side_phase(instance):
+    """Time a short phase."""
+    instance.elapsed_time("side")
+    instance.elapsed_time(None)
+
+
+def make_cli(**kwargs):
+    """Return a ClickLoguru with extra options and a CLI that uses it.
+
+    Options that write files besides the log file are turned on only by
+    the tests that check them, so that other tests don't pay for them.
+    """
+    instance = ClickLoguru(
+        NAME,
+        VERSION,
+        retention=LOG_FILE_RETENTION,
+        timer_log_level="info",
+        **kwargs,
+    )
+
+    @instance.logging_options
+    @click.group()
+    @instance.stash_subcommand()
+    def instrumented_cli(verbose, quiet, logfile, profile_mem):
+        """simple -- with instrumentation options."""
+        unused_str = (
+            f"verbose: {verbose} quiet: {quiet}"
+            + f" logfile: {logfile} profile_mem: {profile_mem}"
+        )
+
+    @instrumented_cli.command()
+    @instance.init_logger()
+    @instance.log_peak_memory_use(level="info")
+    @click.argument("alloc_size", type=int)
+    def log_phase_memory(alloc_size):
+        """Log memory use by phase."""
+        allocate_and_free(instance, alloc_size)
+
+    @instrumented_cli.command()
+    @instance.init_logger()
+    @instance.log_peak_memory_use()
+    @click.argument("alloc_size", type=int)
+    def log_concurrent_memory(alloc_size):
+        """Free a block, then run a phase in another thread."""
+        instance.elapsed_time("hold")
+        arr = bytearray(alloc_size * 1024 * 1024)
+        sleep(0.05)
+        del arr
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(side_phase, instance).result()
+        instance.elapsed_time(None)
+
+    @instrumented_cli.command()
+    @instance.init_logger()
+    @instance.log_peak_memory_use()
+    @click.argument("seconds", type=float)
+    def stall(seconds):
+        """Wait without using CPU."""
+        instance.elapsed_time("wait")
+        sleep(seconds)
+        instance.elapsed_time(None)
+
+    @instrumented_cli.command()
+    @instance.init_logger()
+    @click.argument("seconds", type=float)
+    async def async_stall(seconds):
+        """Wait in an event loop without using CPU."""
+        instance.elapsed_time("wait")
+        await asyncio.sleep(seconds)
+        instance.elapsed_time(None)
+
+    @instrumented_cli.command()
+    @instance.init_logger()
+    @click.argument("how", type=click.Choice(["ctx", "sys"]))
+    @click.argument("code", type=int)
+    def exit_early(how, code):
+        """Log, then exit with a status code."""
+        logger.debug("debug message before exit")
+        if how == "ctx":
+            click.get_current_context().exit(code)
+        sys.exit(code)
+
+    return instance, instrumented_cli
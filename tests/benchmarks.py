@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the overhead of click_loguru instrumentation.
+
+Run from the top-level directory with::
+
+    python -m tests.benchmarks [--compare benchmarks/OLD_VERSION.json]
+
+Results are saved as JSON, by default to ``benchmarks/VERSION.json``.
+"""
+# standard library imports
+import json
+import os
+import platform
+import shutil
+import tempfile
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from time import strftime
+
+# third-party imports
+import click
+from click.testing import CliRunner
+from loguru import logger
+
+# module imports
+from click_loguru import __version__
+
+from . import LOG_FILE_RETENTION
+from . import NAME
+from . import cli
+from .test_click_loguru import import_times
+
+# global constants
+DEFAULT_REPEAT = 5
+DEFAULT_MESSAGES = 10000
+DEFAULT_CALLS = 2000
+DEFAULT_MAX_FILES = 100000
+DEFAULT_MEMORY_MB = 20
+DEFAULT_TOLERANCE = 1.25  # ratio of new to old that counts as a regression
+LOG_DIR = Path("tests/data/logs")  # log_dir_parent of the test CLI
+
+
+def time_invoke(args, repeat):
+    """Return the shortest time of invoking the test CLI, in seconds."""
+    runner = CliRunner()
+    times = []
+    for unused_i in range(repeat):
+        start = perf_counter()
+        result = runner.invoke(cli, args)
+        times.append(perf_counter() - start)
+        if result.exit_code != 0:
+            raise click.ClickException(
+                f"{' '.join(args)} failed:\n{result.output}"
+            )
+    return min(times)
+
+
+def bench_import(repeat):
+    """Cold import time of click_loguru beyond click and loguru."""
+    own_times = []
+    for unused_i in range(repeat):
+        times = import_times("click_loguru")
+        own_times.append(
+            times["click_loguru"] - times["click"] - times["loguru"]
+        )
+    return {"import_us": median(own_times)}
+
+
+def bench_sinks(repeat, n_messages):
+    """Per-message cost of the stderr and log-file sinks."""
+    count = str(n_messages)
+    base = time_invoke(["-q", "--no-logfile", "log-many", count], repeat)
+    stderr = time_invoke(["-v", "--no-logfile", "log-many", count], repeat)
+    logfile = time_invoke(["-q", "log-many", count], repeat)
+    return {
+        "stderr_message_us": 1e6 * (stderr - base) / n_messages,
+        "logfile_message_us": 1e6 * (logfile - base) / n_messages,
+    }
+
+
+def bench_elapsed_time(repeat, n_calls):
+    """Per-call cost of elapsed_time, including its log message."""
+    args = ["-q", "--no-logfile", "elapsed-time-calls"]
+    base = time_invoke(args + ["0"], repeat)
+    calls = time_invoke(args + [str(n_calls)], repeat)
+    return {"elapsed_time_call_us": 1e6 * (calls - base) / n_calls}
+
+
+def bench_profile_mem(repeat, memory_mb):
+    """Slowdown of a memory-bound command from --profile_mem."""
+    args = ["log-memory-use", str(memory_mb)]
+    plain = time_invoke(["-q"] + args, repeat)
+    profiled = time_invoke(["-q", "--profile_mem"] + args, repeat)
+    return {"profile_mem_slowdown": profiled / plain}
+
+
+def bench_log_files(repeat, max_files):
+    """init_logger startup with many existing log files.
+
+    The first run builds the log index from a directory scan and prunes
+    files beyond retention; later runs only read the index.
+    """
+    results = {}
+    n_files = 10
+    while n_files <= max_files:
+        shutil.rmtree(LOG_DIR, ignore_errors=True)
+        LOG_DIR.mkdir(parents=True)
+        for number in range(n_files):
+            (LOG_DIR / f"{NAME}-log-many_{number}.log").touch()
+        results[f"first_start_{n_files}_files_ms"] = 1e3 * time_invoke(
+            ["-q", "log-many", "0"], 1
+        )
+        results[f"start_{n_files}_files_ms"] = 1e3 * time_invoke(
+            ["-q", "log-many", "0"], repeat
+        )
+        remaining = len(list(LOG_DIR.glob("*.log")))
+        assert remaining == LOG_FILE_RETENTION + 1
+        n_files *= 10
+    return results
+
+
+def compare(old, new, tolerance):
+    """Return a comparison table and the names of regressed results."""
+    rows = [f"{'Benchmark':<32} {'Old':>12} {'New':>12} {'Ratio':>7}"]
+    regressions = []
+    for name, new_value in new["results"].items():
+        old_value = old["results"].get(name)
+        if old_value is None or old_value <= 0:
+            continue
+        ratio = new_value / old_value
+        flag = ""
+        if ratio > tolerance:
+            regressions.append(name)
+            flag = " *"
+        rows.append(
+            f"{name:<32} {old_value:12.3f} {new_value:12.3f} {ratio:7.2f}"
+            + flag
+        )
+    return "\n".join(rows), regressions
+
+
+@click.command()
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=DEFAULT_REPEAT,
+    show_default=True,
+    help="Repetitions of each timing; the fastest is kept.",
+)
+@click.option(
+    "--messages",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MESSAGES,
+    show_default=True,
+    help="Messages logged per sink timing.",
+)
+@click.option(
+    "--calls",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CALLS,
+    show_default=True,
+    help="elapsed_time calls per timing.",
+)
+@click.option(
+    "--memory-mb",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MEMORY_MB,
+    show_default=True,
+    help="Memory allocated by the --profile_mem timing.",
+)
+@click.option(
+    "--max-files",
+    type=click.IntRange(min=10),
+    default=DEFAULT_MAX_FILES,
+    show_default=True,
+    help="Largest number of existing log files.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default=f"benchmarks/{__version__}.json",
+    show_default=True,
+    help="Where to save results.",
+)
+@click.option(
+    "--compare",
+    "compare_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Earlier results to compare against.",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Ratio to earlier results that fails the comparison.",
+)
+def main(
+    repeat,
+    messages,
+    calls,
+    memory_mb,
+    max_files,
+    output,
+    compare_path,
+    tolerance,
+):
+    """Benchmark click_loguru instrumentation overhead."""
+    output_path = Path(output).resolve()
+    if compare_path is not None:
+        old = json.loads(Path(compare_path).read_text())
+    results = bench_import(repeat)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            results.update(bench_sinks(repeat, messages))
+            results.update(bench_elapsed_time(repeat, calls))
+            results.update(bench_profile_mem(repeat, memory_mb))
+            results.update(bench_log_files(repeat, max_files))
+        finally:
+            logger.remove()
+            os.chdir(cwd)
+    new = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(new, indent=2) + "\n")
+    for name, value in results.items():
+        click.echo(f"{name:<32} {value:12.3f}")
+    if compare_path is not None:
+        table, regressions = compare(old, new, tolerance)
+        click.echo(f"\nCompared to {old['version']}:\n{table}")
+        if regressions:
+            raise click.ClickException(
+                f"regressions beyond {tolerance}x: {', '.join(regressions)}"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()  # pylint: disable=no-value-for-parameter
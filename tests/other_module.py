@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 """Log from another module."""
 
+# standard library imports
+import os
+
 # third-party imports
 from loguru import logger
 
@@ -11,3 +14,10 @@ def other_module_levels():
     logger.info("info message")
     logger.warning("warning message")
     logger.error("error message")
+
+
+def worker_levels(task):
+    """Log at different severity levels from a worker process."""
+    logger.debug(f"worker debug message {task}")
+    logger.info(f"worker info message {task}")
+    return os.getpid()
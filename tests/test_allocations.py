@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Test allocation tracing."""
+# module imports
+from click_loguru.allocations import AllocationTracer
+from click_loguru.memory import MEGABYTE
+
+from .test_click_loguru import print_docstring
+
+# global constants
+ALLOC_MB = 10
+
+
+@print_docstring()
+def test_peak_snapshot():
+    """Test that the peak snapshot shows memory freed before the end."""
+    with AllocationTracer(n_frames=1, interval=0.001) as tracer:
+        start_snapshot = tracer.mark()
+        block = bytearray(ALLOC_MB * MEGABYTE)
+        tracer.check_peak()
+        del block
+        end_snapshot = tracer.mark()
+    assert tracer.peak >= ALLOC_MB * MEGABYTE
+    top = tracer.top_sites(tracer.peak_snapshot, n_sites=1)
+    assert top.split()[:2] == [f"{ALLOC_MB}.0", "MB"]
+    assert f"{__file__}:" in top
+    changes = tracer.changed_sites(end_snapshot, start_snapshot, n_sites=1)
+    assert f"{ALLOC_MB}.0 MB" not in changes
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Test log-file analysis."""
+# standard library imports
+import gzip
+
+# third-party imports
+from click.testing import CliRunner
+from loguru import logger
+
+# module imports
+from click_loguru.__main__ import cli
+from click_loguru.analysis import summarize_log
+from click_loguru.heartbeat import Heartbeat
+
+from .test_click_loguru import print_docstring
+
+# global constants
+LOG_LINE = "2026-10-17 17:16:09.825 | INFO     | tests:download:12 - {}\n"
+
+
+def write_run(path, load_seconds, peak_mb):
+    """Write a log file with two phases and a peak memory line."""
+    messages = [
+        "Command line: simple download",
+        f"Load elapsed time is 0:00:{load_seconds:02d}, 1.5 s process CPU,"
+        + f" peak {peak_mb:.1f} MB (+10.0 MB)",
+        "Save elapsed time is 0:00:02, 0.5 s process CPU",
+        f"Peak total memory use = {peak_mb} MB.",
+        f"Total elapsed time is 0:00:{load_seconds + 2:02d},"
+        + " 2.0 s process CPU",
+    ]
+    with path.open("w") as logfile:
+        for message in messages:
+            logfile.write(LOG_LINE.format(message))
+
+
+@print_docstring()
+def test_summarize_log(tmp_path):
+    """Test parsing of plain and compressed JSON log files."""
+    write_run(tmp_path / "simple-download_0.log", 10, 100)
+    summary = summarize_log(tmp_path / "simple-download_0.log")
+    assert summary["max_mem"] == 100 * 1024 * 1024
+    assert summary["phases"]["Load"] == {
+        "wall": 10.0,
+        "cpu": 1.5,
+        "peak": 100 * 1024 * 1024,
+    }
+    assert list(summary["phases"]) == ["Load", "Save", "Total"]
+    json_path = tmp_path / "simple-download_1.log.gz"
+    with gzip.open(json_path, "wt") as logfile:
+        logfile.write(
+            '{"name":"simple","message":"Load elapsed time is 1:00:00,'
+            + ' 3600.0 s process CPU"}\n'
+        )
+    summary = summarize_log(json_path)
+    assert summary["phases"]["Load"]["wall"] == 3600.0
+    assert summary["max_mem"] is None
+
+
+@print_docstring()
+def test_compare_runs(tmp_path):
+    """Test trends and regressions of the newest run."""
+    for number, (load_seconds, peak_mb) in enumerate(
+        [(10, 100), (11, 100), (9, 100), (20, 300)]
+    ):
+        write_run(
+            tmp_path / f"simple-download_{number}.log", load_seconds, peak_mb
+        )
+    write_run(tmp_path / "simple-other_0.log", 10, 100)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["summarize", str(tmp_path)])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0] == "simple-download:"
+    assert lines[4] == (
+        "  simple-download_3.log: 22 s, 2.0 s CPU, peak 300.0 MB, 2 phases"
+    )
+    result = runner.invoke(cli, ["compare", str(tmp_path)])
+    assert result.exit_code == 1
+    lines = result.output.split("\n")
+    assert lines[0] == "simple-download (simple-download_3.log vs. 3 earlier):"
+    regressed = [line.split()[:2] for line in lines if "REGRESSION" in line]
+    assert regressed == [
+        ["Load", "wall"],
+        ["Load", "peak"],
+        ["Total", "wall"],
+        ["Total", "max_mem"],
+    ]
+    assert "simple-other" not in result.output
+    assert "4 regressions found" in result.output
+    result = runner.invoke(
+        cli, ["compare", str(tmp_path), "--threshold", "10"]
+    )
+    assert result.exit_code == 0
+
+
+@print_docstring()
+def test_summarize_with_heartbeats(tmp_path):
+    """Test that heartbeat and stall messages are not read as phases."""
+    logfile_path = tmp_path / "simple-download_0.log"
+    write_run(logfile_path, 10, 100)
+    heartbeat = Heartbeat(
+        interval=60.0, stall_timeout=30.0, get_phase=lambda: "Load"
+    )
+    heartbeat._reset(0.0, 0.0)  # pylint: disable=protected-access
+    handler_id = logger.add(str(logfile_path), level="DEBUG")
+    try:
+        heartbeat.check(60.0, 0.0)
+        heartbeat.check(120.0, 30.0)
+    finally:
+        logger.remove(handler_id)
+    log_text = logfile_path.read_text()
+    assert log_text.count("Heartbeat: Load phase") == 2
+    assert "Stalled: Load phase" in log_text
+    summary = summarize_log(logfile_path)
+    assert list(summary["phases"]) == ["Load", "Save", "Total"]
+    assert summary["phases"]["Total"]["wall"] == 12.0
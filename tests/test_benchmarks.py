@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Test the benchmark suite."""
+# standard library imports
+import json
+
+# third-party imports
+from click.testing import CliRunner
+
+# module imports
+from .benchmarks import main
+from .test_click_loguru import print_docstring
+
+
+@print_docstring()
+def test_benchmarks_run(tmp_path):
+    """Test a minimal benchmark run, saved and compared to itself."""
+    output_path = tmp_path / "results.json"
+    args = ["--repeat", "1", "--messages", "10", "--calls", "10"]
+    args += ["--memory-mb", "1", "--max-files", "10"]
+    args += ["--output", str(output_path)]
+    runner = CliRunner()
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    results = json.loads(output_path.read_text())["results"]
+    assert "logfile_message_us" in results
+    assert "start_10_files_ms" in results
+    result = runner.invoke(
+        main, args + ["--compare", str(output_path), "--tolerance", "1e9"]
+    )
+    assert result.exit_code == 0
+    assert "Compared to " in result.output
@@ -2,10 +2,20 @@
 """Test click_loguru via the simple.py app."""
 import functools
 import os
+import pstats
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from click.testing import CliRunner
+from loguru import logger
+from click_loguru.timeline import read_timeline
 from . import cli
+from . import make_cli
+
+# global constants
+IMPORT_BUDGET_US = 50000  # import time of click_loguru beyond click and loguru
 
 
 def print_docstring():
@@ -74,7 +84,7 @@ def test_levels(tmp_path):
     result = runner.invoke(cli, ["levels"])
     logfile_path = Path(result.output.split("\n")[-2].split()[1])
     assert result.exit_code == 0
-    assert len(list(Path("tests/data/logs").glob("*"))) == 1
+    assert len(list(Path("tests/data/logs").glob("*.log"))) == 1
     level_checker(logfile_path)
 
 
@@ -101,7 +111,7 @@ def test_retention(tmp_path):
         result = runner.invoke(cli, ["levels"])
         assert result.exit_code == 0
         log_count += 1
-    assert len(list(Path("tests/data/logs").glob("*"))) == 4
+    assert len(list(Path("tests/data/logs").glob("*.log"))) == 4
 
 
 @print_docstring()
@@ -125,7 +135,7 @@ def test_other_module(tmp_path):
     result = runner.invoke(cli, ["other-module"])
     logfile_path = Path(result.output.split("\n")[-2].split()[1])
     assert result.exit_code == 0
-    assert len(list(Path("tests/data/logs").glob("*"))) == 1
+    assert len(list(Path("tests/data/logs").glob("*.log"))) == 1
     level_checker(logfile_path)
 
 
@@ -163,3 +173,362 @@ def test_memory_profiling(tmp_path):
     )
     inc_mem_size = get_mem_use_from_logstring(result.output)
     assert (inc_mem_size - base_mem_size - mem_inc_mb) <= 1
+
+
+def import_times(module):
+    """Return cumulative import times in us, by module, from a new process."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stderr=subprocess.PIPE,
+        cwd=Path(__file__).resolve().parent.parent,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.split("\n"):
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isnumeric():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+@print_docstring()
+def test_import_time():
+    """Test that import is fast and defers heavy modules."""
+    times = import_times("click_loguru")
+    for heavy in ("memory_profiler", "psutil", "attr"):
+        assert heavy not in times
+    own_time = times["click_loguru"] - times["click"] - times["loguru"]
+    assert own_time < IMPORT_BUDGET_US
+
+
+@print_docstring()
+def test_phase_memory(tmp_path):
+    """Test per-phase memory logging."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-phase-memory", "10"])
+    assert result.exit_code == 0
+    assert "peak" not in result.output
+    result = runner.invoke(cli, ["--profile_mem", "log-phase-memory", "100"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith("Allocate elapsed time")
+    assert float(lines[0].split("(")[1].split()[0]) >= 99.0
+    assert lines[1].startswith("Free elapsed time")
+    assert float(lines[1].split("(")[1].split()[0]) <= -99.0
+    assert not list(Path("tests/data/logs").glob("*.memtl"))
+
+
+def peak_mb(line):
+    """Return the peak memory in MB from an elapsed-time line."""
+    value, unit = line.split(", peak ")[1].split()[:2]
+    return float(value) * (1024 if unit == "GB" else 1)
+
+
+@print_docstring()
+def test_concurrent_phase_memory(tmp_path):
+    """Test that a phase in another thread leaves a phase's peak alone."""
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(tmp_path / "logs"), memory_sample_interval=0.01
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        instrumented_cli, ["--profile_mem", "log-concurrent-memory", "200"]
+    )
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith("Side elapsed time")
+    assert lines[1].startswith("Hold elapsed time")
+    assert peak_mb(lines[1]) - peak_mb(lines[0]) >= 190.0
+
+
+@print_docstring()
+def test_memory_timeline(tmp_path):
+    """Test the memory timeline written next to the log file."""
+    log_dir = tmp_path / "logs"
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(log_dir), memory_timeline=True
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        instrumented_cli, ["--profile_mem", "log-phase-memory", "100"]
+    )
+    assert result.exit_code == 0
+    timelines = list(log_dir.glob("*.memtl"))
+    assert len(timelines) == 1
+    unused_start, samples, markers = read_timeline(timelines[0])
+    assert [name for unused_t, name in markers] == ["Allocate", "Free", None]
+    assert max(rss for unused_time, rss in samples) >= 100 * 1024 * 1024
+
+
+@print_docstring()
+def test_metrics_file(tmp_path):
+    """Test the OpenMetrics textfile written at exit."""
+    metrics_dir = tmp_path / "metrics"
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(tmp_path / "logs"), metrics_dir=str(metrics_dir)
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        instrumented_cli, ["--profile_mem", "log-phase-memory", "10"]
+    )
+    assert result.exit_code == 0
+    assert [p.name for p in metrics_dir.iterdir()] == [
+        "simple-log-phase-memory.prom"
+    ]
+    lines = (metrics_dir / "simple-log-phase-memory.prom").read_text()
+    lines = lines.split("\n")
+    labels = 'name="simple",version="0.4.0",subcommand="log-phase-memory"'
+    assert f"click_loguru_exit_status{{{labels}}} 0" in lines
+    wall = f'click_loguru_phase_wall_seconds{{{labels},phase="Total/Free"}}'
+    assert any(line.startswith(wall + " ") for line in lines)
+    peak = [l for l in lines if l.startswith("click_loguru_peak_rss_bytes")]
+    assert int(peak[0].split()[-1]) >= 10 * 1024 * 1024
+    assert lines[-2:] == ["# EOF", ""]
+    labels = 'name="simple",version="0.4.0",subcommand="exit-early"'
+    for how, code in (("ctx", 0), ("sys", 0), ("sys", 4)):
+        result = runner.invoke(
+            instrumented_cli, ["exit-early", how, str(code)]
+        )
+        assert result.exit_code == code
+        text = (metrics_dir / "simple-exit-early.prom").read_text()
+        assert f"click_loguru_exit_status{{{labels}}} {code}\n" in text
+
+
+@print_docstring()
+def test_exit_status(tmp_path):
+    """Test that clean early exits are not treated as failures."""
+    log_dir = tmp_path / "logs"
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(log_dir), ring_buffer_size=10
+    )
+    runner = CliRunner()
+    for how, code in (("ctx", 0), ("sys", 0), ("ctx", 3), ("sys", 2)):
+        result = runner.invoke(
+            instrumented_cli, ["exit-early", how, str(code)]
+        )
+        assert result.exit_code == code
+        logger.remove()
+        logfile = max(
+            log_dir.glob("*.log"), key=lambda p: int(p.stem.split("_")[-1])
+        )
+        dumped = "debug message before exit" in logfile.read_text()
+        assert dumped == bool(code)
+
+
+@print_docstring()
+def test_resource_usage(tmp_path):
+    """Test per-run and per-phase resource usage logging."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-resource-usage"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith("Compute elapsed time")
+    assert lines[1].startswith("Compute resource usage: ")
+    assert "max RSS" not in lines[1]
+    assert lines[3].startswith("Sleep resource usage: ")
+    assert lines[-2].startswith("Resource usage: ")
+    assert "context switches" in lines[-2]
+    assert "max RSS" in lines[-2]
+
+
+@print_docstring()
+def test_allocations(tmp_path):
+    """Test allocation sites logged with --trace-alloc."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-allocations"])
+    assert result.exit_code == 0
+    assert "allocation" not in result.output
+    result = runner.invoke(cli, ["--trace-alloc", "1", "log-allocations"])
+    assert result.exit_code == 0
+    sections = result.output.split("allocation ")
+    assert sections[1].startswith("sites:\n")
+    assert "tests/__init__.py" in sections[1].split("\n")[1]
+    assert sections[4].startswith("changes:\n")
+    assert "-20.0 MB" in sections[4].split("\n")[1]
+    peak = result.output.split("sites near peak:\n")[1].split("\n")
+    assert peak[0].split()[:2] == ["20.0", "MB"]
+
+
+@print_docstring()
+def test_timing_tree(tmp_path):
+    """Test the end-of-run timing summary."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-timing-tree"])
+    assert result.exit_code == 0
+    summary = result.output.split("Timing summary:\n")[1].split("\n")
+    assert summary[0].split() == ["Phase", "Wall", "(s)", "CPU", "(s)",
+                                  "%", "total", "Calls"]
+    assert summary[1].startswith("Total ")
+    assert summary[2].startswith("  Setup ")
+    assert summary[3].startswith("    loop ")
+    assert summary[4].startswith("      step ")
+    assert summary[4].split()[-1] == "3"
+
+
+@print_docstring()
+def test_threaded_phases(tmp_path):
+    """Test that threads keep their own phases."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-threaded-phases"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    for stage in range(2):
+        assert sum(
+            line.startswith(f"{stage} load elapsed time") for line in lines
+        ) == 1
+    assert lines[4].startswith("Main elapsed time")
+    summary = result.output.split("Timing summary:\n")[1].split("\n")
+    names = [line.split()[0] for line in summary[2:7]]
+    assert sorted(names) == ["0", "0", "1", "1", "Main"]
+
+
+@print_docstring()
+def test_async_command(tmp_path):
+    """Test decorators on a coroutine command."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["--profile_mem", "log-async"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith("Download 0 elapsed time")
+    assert lines[1].startswith("Download 1 elapsed time")
+    logfile_path = Path(lines[2].split()[1])
+    assert "Peak total memory use" in lines[3]
+    assert lines[4].startswith("Total elapsed time")
+    summary = result.output.split("Timing summary:\n")[1].split("\n")
+    for row in summary[2:4]:
+        assert float(row.split()[2]) >= 0.1
+    assert float(summary[1].split()[1]) < 0.2 + float(summary[2].split()[2])
+    logger.remove()  # drain the background log writer
+    log_text = logfile_path.read_text()
+    assert "downloaded 0" in log_text
+    assert "downloaded 1" in log_text
+
+
+@print_docstring()
+def test_nested_task_phase(tmp_path):
+    """Test that a task's phase nests in, and leaves, its creator's."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-nested-task"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith("Child elapsed time")
+    assert lines[1].startswith("Main elapsed time")
+    assert lines[2].startswith("Total elapsed time")
+    summary = result.output.split("Timing summary:\n")[1].split("\n")
+    assert [row.split()[0] for row in summary[1:4]] == [
+        "Total",
+        "Main",
+        "Child",
+    ]
+    assert summary[2].split()[-1] == "1"
+    assert summary[3].startswith("    Child")
+    assert float(summary[3].split()[1]) >= 0.05
+
+
+@print_docstring()
+def test_hot_timers(tmp_path):
+    """Test the end-of-run hot-timer summary."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-hot-timers"])
+    assert result.exit_code == 0
+    summary = result.output.split("Hot timer summary:\n")[1].split("\n")
+    assert summary[0].split()[:2] == ["Timer", "Count"]
+    assert summary[1].split()[:2] == ["record", "1000"]
+    assert summary[2].split()[:2] == ["block", "1"]
+
+
+@print_docstring()
+def test_cpu_profile(tmp_path):
+    """Test deterministic and sampling CPU profiles."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-cpu-profile"])
+    assert result.exit_code == 0
+    assert "CPU profile" not in result.output
+    for mode in ("cprofile", "sample"):
+        result = runner.invoke(cli, ["--profile", mode, "log-cpu-profile"])
+        assert result.exit_code == 0
+        assert f"CPU profile ({mode})" in result.output
+        summary = result.output.split("functions by self time:\n")[1]
+        assert "busy_loop" in summary.split("\n")[1]
+        logfile_path = Path(result.output.split("\n")[0].split()[1])
+        stats = pstats.Stats(str(logfile_path.with_suffix(".pstats")))
+        assert stats.total_tt > 0
+    collapsed_path = logfile_path.with_suffix(".collapsed")
+    assert "busy_loop" in collapsed_path.read_text()
+
+
+@print_docstring()
+def test_cpu_profile_fallback(tmp_path):
+    """Test the warning when sampling falls back to cProfile."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(
+            runner.invoke, cli, ["--profile", "sample", "log-cpu-profile"]
+        ).result()
+    assert result.exit_code == 0
+    assert (
+        "WARNING: CPU profile mode sample is unavailable here,"
+        + " using cprofile instead"
+    ) in result.output
+    assert "CPU profile (cprofile)" in result.output
+    logfile_path = Path(result.output.split("logfile_path: ")[1].split()[0])
+    assert logfile_path.with_suffix(".pstats").exists()
+    assert not logfile_path.with_suffix(".collapsed").exists()
+
+
+@print_docstring()
+def test_worker_logging(tmp_path):
+    """Test logging from worker processes into the numbered log file."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["log-from-workers"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    pids = lines[-3].split(":")[1].split()
+    logfile_path = Path(lines[-2].split()[1])
+    log_text = logfile_path.read_text()
+    for task in range(4):
+        assert f"worker debug message {task}" in log_text
+        assert f"worker info message {task}" in result.output
+    for pid in pids:
+        assert f"[pid {pid}] worker" in log_text
+    assert "other_module:worker_levels" in log_text
+
+
+@print_docstring()
+def test_module_log_levels(tmp_path):
+    """Test setting log levels per module."""
+    runner = CliRunner()
+    os.chdir(tmp_path)
+    result = runner.invoke(cli, ["other-module"])
+    assert "debug message" not in result.output
+    result = runner.invoke(
+        cli, ["--log-level", "tests.other_module=DEBUG", "other-module"]
+    )
+    assert result.exit_code == 0
+    assert "debug message" in result.output
+    result = runner.invoke(
+        cli, ["--log-level", "tests=error", "other-module"]
+    )
+    assert result.exit_code == 0
+    assert "info message" not in result.output
+    logfile_path = Path(result.output.split("\n")[-2].split()[1])
+    log_text = logfile_path.read_text()
+    assert "Command line" in log_text
+    assert "warning message" not in log_text
+    assert "error message" in log_text
+    result = runner.invoke(cli, ["--log-level", "tests", "other-module"])
+    assert result.exit_code == 2
+    result = runner.invoke(cli, ["--log-level", "tests=LOUD", "other-module"])
+    assert result.exit_code == 2
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Test click_loguru log filters."""
+# third-party imports
+from loguru import logger
+
+# module imports
+from click_loguru.filters import ModuleLevelFilter
+from click_loguru.filters import RateLimitFilter
+
+from .test_click_loguru import print_docstring
+
+
+def log_to_lists(log_filter):
+    """Add two sinks sharing a filter, returning their message lists."""
+    outputs = ([], [])
+    handler_ids = [
+        logger.add(output.append, format="{message}", filter=log_filter)
+        for output in outputs
+    ]
+    return outputs, handler_ids
+
+
+@print_docstring()
+def test_dedup():
+    """Test collapsing repeated messages from a call site."""
+    log_filter = RateLimitFilter(dedup=True)
+    outputs, handler_ids = log_to_lists(log_filter)
+    for i in range(1000):
+        logger.warning("same warning" if i < 999 else "new warning")
+        logger.debug("other message")
+    for unused_i in range(3):
+        logger.error("same error")
+    log_filter.flush()
+    for handler_id in handler_ids:
+        logger.remove(handler_id)
+    assert outputs[0] == outputs[1]
+    assert [m.strip() for m in outputs[0]] == [
+        "same warning",
+        "other message",
+        "last message repeated 998 times",
+        "new warning",
+        "same error",
+        "same error",
+        "same error",
+        "last message repeated 999 times",
+    ]
+
+
+@print_docstring()
+def test_rate_limit():
+    """Test token-bucket limiting of distinct messages from a call site."""
+    log_filter = RateLimitFilter(rate=0.001, burst=5, dedup=False)
+    outputs, handler_ids = log_to_lists(log_filter)
+    for i in range(100):
+        logger.info(f"record {i}")
+    log_filter.flush()
+    for handler_id in handler_ids:
+        logger.remove(handler_id)
+    assert outputs[0] == outputs[1]
+    assert [m.strip() for m in outputs[0]] == [
+        "record 0",
+        "record 1",
+        "record 2",
+        "record 3",
+        "record 4",
+        "95 messages suppressed by rate limit",
+    ]
+
+
+@print_docstring()
+def test_module_level_filter():
+    """Test longest-match per-module levels."""
+    log_filter = ModuleLevelFilter(
+        {"noisy": "WARNING", "noisy.debugged": "DEBUG"}, "INFO"
+    )
+    assert log_filter.min_level == 10
+    assert log_filter.level_no("noisy") == 30
+    assert log_filter.level_no("noisy.sub.module") == 30
+    assert log_filter.level_no("noisy.debugged.sub") == 10
+    assert log_filter.level_no("noisy_other") == 20
+    assert log_filter.level_no("quiet") == 20
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Test the heartbeat and stall watchdog."""
+# standard library imports
+import json
+from time import sleep
+
+# third-party imports
+from click.testing import CliRunner
+from loguru import logger
+
+# module imports
+from click_loguru.heartbeat import Heartbeat
+
+from . import make_cli
+from .test_click_loguru import print_docstring
+
+
+def capture_messages():
+    """Return a list that collects logged messages, and its handler id."""
+    messages = []
+    handler_id = logger.add(
+        lambda message: messages.append(message.record), level="DEBUG"
+    )
+    return messages, handler_id
+
+
+@print_docstring()
+def test_heartbeat_check():
+    """Test heartbeats and stall warnings from given times."""
+    messages, handler_id = capture_messages()
+    try:
+        heartbeat = Heartbeat(
+            interval=60.0, stall_timeout=30.0, get_phase=lambda: "Load"
+        )
+        assert heartbeat.check_interval == 7.5
+        heartbeat._reset(0.0, 0.0)  # pylint: disable=protected-access
+        heartbeat.check(30.0, 30.0)  # busy
+        heartbeat.check(45.0, 30.0)  # idle, but not for long enough
+        assert not messages
+        heartbeat.check(60.0, 30.0)  # stalled since 30 s, and heartbeat
+        heartbeat.check(75.0, 30.0)  # only warned once
+        warning, beat = messages
+        messages.clear()
+        assert warning["level"].name == "WARNING"
+        assert warning["message"] == (
+            "Stalled: Load phase, no CPU time used in 0:00:30"
+        )
+        assert beat["level"].name == "DEBUG"
+        assert beat["message"].startswith(
+            "Heartbeat: Load phase, running for 0:01:00,"
+            + " 30.0 s process CPU (50% CPU)"
+        )
+        heartbeat.check(76.0, 31.0)
+        assert messages.pop()["message"] == (
+            "CPU time advancing again after 0:00:45"
+        )
+        assert heartbeat.stalls == 1
+    finally:
+        logger.remove(handler_id)
+
+
+@print_docstring()
+def test_stall_stacks():
+    """Test that a stall warning shows the stacks of other threads."""
+    messages, handler_id = capture_messages()
+    try:
+        with Heartbeat(stall_timeout=0.2, dump_stacks=True) as heartbeat:
+            sleep(0.5)
+    finally:
+        logger.remove(handler_id)
+    assert heartbeat.stalls == 1
+    warning = messages[0]["message"]
+    assert warning.startswith("Stalled: no CPU time used in 0:00:00\n")
+    assert 'Thread "MainThread":' in warning
+    assert "in test_stall_stacks" in warning
+
+
+@print_docstring()
+def test_heartbeat_from_cli(tmp_path):
+    """Test the phase of the command in heartbeats of a command."""
+    log_dir = tmp_path / "logs"
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(log_dir), heartbeat_interval=0.1, stall_timeout=0.2
+    )
+    runner = CliRunner()
+    result = runner.invoke(instrumented_cli, ["-v", "stall", "0.5"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    beats = [line for line in lines if line.startswith("Heartbeat: ")]
+    assert len(beats) >= 2
+    assert beats[-1].startswith("Heartbeat: Wait phase, running for ")
+    assert any(
+        line.startswith("WARNING: Stalled: Wait phase, no CPU time used in")
+        for line in lines
+    )
+    logger.remove()
+    logfile = next(log_dir.glob("simple-stall_*.log"))
+    assert "Heartbeat: Wait phase" in logfile.read_text()
+
+
+@print_docstring()
+def test_stall_with_profile_mem(tmp_path):
+    """Test that memory sampling does not count as command progress."""
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(tmp_path / "logs"),
+        stall_timeout=0.4,
+        memory_sample_interval=0.01,
+    )
+    runner = CliRunner()
+    result = runner.invoke(
+        instrumented_cli, ["-v", "--profile_mem", "stall", "1.5"]
+    )
+    assert result.exit_code == 0
+    assert "Peak total memory use" in result.output
+    assert "WARNING: Stalled: Wait phase, no CPU time used in" in result.output
+
+
+@print_docstring()
+def test_heartbeat_async_json(tmp_path):
+    """Test the phase of an async command in JSON heartbeat records."""
+    log_dir = tmp_path / "logs"
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(log_dir),
+        heartbeat_interval=0.1,
+        logfile_format="json",
+    )
+    runner = CliRunner()
+    result = runner.invoke(instrumented_cli, ["-q", "async-stall", "0.35"])
+    assert result.exit_code == 0
+    logger.remove()  # drain the background log writer
+    logfile = next(log_dir.glob("simple-async-stall_*.log"))
+    lines = logfile.read_text().split("\n")[:-1]
+    records = [json.loads(line) for line in lines]
+    beats = [r for r in records if r["message"].startswith("Heartbeat: ")]
+    assert len(beats) >= 2
+    for beat in beats:
+        assert beat["phase"] == "Wait"
+        assert beat["message"].startswith("Heartbeat: Wait phase, ")
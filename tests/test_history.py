@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Test the run-history database."""
+# third-party imports
+from click.testing import CliRunner
+
+# module imports
+from click_loguru.__main__ import cli as analysis_cli
+from click_loguru.history import RunHistory
+from click_loguru.history import percentile
+
+from . import LOG_FILE_RETENTION
+from . import make_cli
+from .test_click_loguru import print_docstring
+
+
+def timings(load_wall):
+    """Return a timing tree with one child phase."""
+    return {
+        "name": "Total",
+        "wall": load_wall + 1.0,
+        "cpu": 1.0,
+        "calls": 1,
+        "children": [
+            {
+                "name": "Load",
+                "wall": load_wall,
+                "cpu": 0.5,
+                "calls": 2,
+                "children": [],
+            }
+        ],
+    }
+
+
+@print_docstring()
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+@print_docstring()
+def test_run_history(tmp_path):
+    """Test recording runs and phase statistics over the last runs."""
+    history = RunHistory(tmp_path / "logs" / "simple.history.sqlite")
+    for number in range(1, 21):
+        history.record(
+            {
+                "name": "simple",
+                "subcommand": "load" if number % 2 else "save",
+                "start_time": float(number),
+                "wall": number + 1.0,
+                "exit_status": 0,
+            },
+            timings(float(number)),
+        )
+    runs = history.runs(last=3)
+    assert [run["start_time"] for run in runs] == [20.0, 19.0, 18.0]
+    assert runs[0]["max_mem"] is None
+    stats = history.phase_stats(subcommand="load")
+    assert list(stats) == ["Total", "Total/Load"]
+    load = stats["Total/Load"]
+    assert load["count"] == 10
+    assert load["mean"] == 10.0
+    assert (load["p50"], load["p95"], load["max"]) == (9.0, 19.0, 19.0)
+    stats = history.phase_stats("Total/Load", last=4, metric="calls")
+    assert stats == {
+        "Total/Load": {"count": 4, "mean": 2.0, "max": 2, "p50": 2, "p95": 2}
+    }
+
+
+@print_docstring()
+def test_history_from_cli(tmp_path):
+    """Test that runs are recorded and survive log-file pruning."""
+    log_dir = tmp_path / "logs"
+    unused_instance, instrumented_cli = make_cli(
+        log_dir_parent=str(log_dir), run_history=True
+    )
+    runner = CliRunner()
+    for unused_i in range(LOG_FILE_RETENTION + 2):
+        result = runner.invoke(instrumented_cli, ["log-phase-memory", "1"])
+        assert result.exit_code == 0
+    result = runner.invoke(instrumented_cli, ["log-phase-memory", "bad"])
+    assert result.exit_code != 0
+    for how, code in (("ctx", 0), ("sys", 0), ("ctx", 5)):
+        result = runner.invoke(
+            instrumented_cli, ["exit-early", how, str(code)]
+        )
+        assert result.exit_code == code
+    runs = RunHistory(log_dir / "simple.history.sqlite").runs()
+    assert [run["exit_status"] for run in runs[:3]] == [5, 0, 0]
+    runs = runs[3:]
+    assert len(runs) == LOG_FILE_RETENTION + 2
+    assert {run["subcommand"] for run in runs} == {"log-phase-memory"}
+    assert runs[0]["logfile"].endswith(".log")
+    result = runner.invoke(
+        analysis_cli,
+        ["history", str(log_dir), "--subcommand", "log-phase-memory"],
+    )
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0] == "simple.history.sqlite:"
+    assert lines[1].split() == ["Phase", "Runs", "Mean", "Max", "p50", "p95"]
+    assert lines[2].split()[:2] == ["Total", str(LOG_FILE_RETENTION + 2)]
+    assert lines[3].split()[0] == "Total/Allocate"
+    result = runner.invoke(
+        analysis_cli, ["history", str(log_dir), "--runs", "--last", "2"]
+    )
+    assert result.exit_code == 0
+    lines = result.output.strip().split("\n")
+    assert len(lines) == 3
+    assert " exit-early 0.4.0: " in lines[1]
+    assert lines[1].endswith(", exit status 5")
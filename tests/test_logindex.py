@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Test log-number allocation."""
+# standard library imports
+import multiprocessing
+
+# module imports
+from click_loguru.logindex import LogIndex
+
+from .test_click_loguru import print_docstring
+
+# global constants
+N_PROCESSES = 8
+N_ALLOCATIONS = 25
+
+
+def allocate_many(log_dir_path):
+    """Allocate log numbers in a worker process."""
+    log_index = LogIndex(log_dir_path, "simple-levels")
+    return [log_index.allocate() for unused_i in range(N_ALLOCATIONS)]
+
+
+@print_docstring()
+def test_concurrent_allocation(tmp_path):
+    """Test that concurrent allocations never collide."""
+    with multiprocessing.Pool(N_PROCESSES) as pool:
+        results = pool.map(allocate_many, [tmp_path] * N_PROCESSES)
+    numbers = sorted(n for result in results for n in result)
+    assert numbers == list(range(N_PROCESSES * N_ALLOCATIONS))
+
+
+@print_docstring()
+def test_index_bootstrap_and_retention(tmp_path):
+    """Test building the index from existing files, then pruning."""
+    for number in (3, 4, 7):
+        (tmp_path / f"simple_{number}.log").touch()
+    (tmp_path / "simple_other.log").touch()
+    log_index = LogIndex(tmp_path, "simple", retention=2)
+    assert log_index.allocate() == 8
+    assert log_index.allocate() == 9
+    remaining = sorted(f.name for f in tmp_path.glob("simple_*.log"))
+    assert remaining == ["simple_7.log", "simple_other.log"]
+    assert log_index.index_path.read_text() == "7 10\n"
+
+
+@print_docstring()
+def test_index_bootstrap_compressed(tmp_path):
+    """Test that compressed log files are counted when building the index."""
+    (tmp_path / "simple_3.log").touch()
+    (tmp_path / "simple_5.log.gz").touch()
+    (tmp_path / "simple_9.log.bak").touch()
+    log_index = LogIndex(
+        tmp_path, "simple", retention=1, suffixes=(".log", ".log.gz")
+    )
+    assert log_index.allocate() == 6
+    assert sorted(f.name for f in tmp_path.glob("simple_*")) == [
+        "simple_5.log.gz",
+        "simple_9.log.bak",
+    ]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Test memory sampling."""
+# standard library imports
+import subprocess
+import sys
+import time
+
+# module imports
+from click_loguru.memory import DEFAULT_SAMPLE_INTERVAL
+from click_loguru.memory import MEGABYTE
+from click_loguru.memory import MemorySampler
+
+from .test_click_loguru import print_docstring
+
+# global constants
+CHILD_ALLOC_MB = 50
+MAX_OVERHEAD = 0.01  # fraction of a CPU used by the sampling thread
+OVERHEAD_RUN_TIME = 2.0  # seconds
+
+
+@print_docstring()
+def test_child_memory():
+    """Test that memory use of child processes is included in the peak."""
+    with MemorySampler() as sampler:
+        base_rss = sampler.sample()
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                f"import time; x = bytearray({CHILD_ALLOC_MB * MEGABYTE});"
+                + " time.sleep(0.5)",
+            ],
+            check=True,
+        )
+    assert sampler.peak - base_rss > (CHILD_ALLOC_MB - 5) * MEGABYTE
+
+
+class TimedSampler(MemorySampler):
+    """A memory sampler that measures the CPU time of its thread."""
+
+    thread_cpu = None
+
+    def _run(self):
+        """Sample until stopped, timing all the work of the thread."""
+        start = time.thread_time()
+        super()._run()
+        self.thread_cpu = time.thread_time() - start
+
+
+@print_docstring()
+def test_sampling_overhead():
+    """Test that the sampling thread uses less than 1% of a CPU."""
+    sampler = TimedSampler(DEFAULT_SAMPLE_INTERVAL)
+    start = time.perf_counter()
+    with sampler:
+        time.sleep(OVERHEAD_RUN_TIME)
+    wall = time.perf_counter() - start
+    assert sampler.thread_cpu < MAX_OVERHEAD * wall
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Test merging of log files."""
+# standard library imports
+import gzip
+import json
+
+# third-party imports
+from click.testing import CliRunner
+
+# module imports
+from click_loguru.__main__ import cli
+from click_loguru.merge import merge_logs
+from click_loguru.merge import source_names
+
+from .test_click_loguru import print_docstring
+
+# global constants
+LOG_LINE = "2026-10-17 17:16:{:06.3f} | INFO     | tests:work:12 - {}\n"
+
+
+def write_log(path, seconds, extra_lines=()):
+    """Write a text log file with one message at each of some seconds."""
+    lines = [LOG_LINE.format(s, f"{path.name} at {s}") for s in seconds]
+    lines[0] += "".join(extra_lines)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "wt") as logfile:
+        logfile.write("".join(lines))
+
+
+@print_docstring()
+def test_merge_logs(tmp_path):
+    """Test time order, continuation lines, and compressed input."""
+    first = tmp_path / "host1" / "simple_0.log"
+    second = tmp_path / "host2" / "simple_0.log.gz"
+    first.parent.mkdir()
+    second.parent.mkdir()
+    write_log(first, [1.0, 3.5, 3.5], extra_lines=["Traceback:\n"])
+    write_log(second, [0.5, 2.0, 3.5, 9.0])
+    merged = list(merge_logs([first, second]))
+    assert [source for source, lines in merged] == [
+        "simple_0.log.gz",
+        "simple_0.log",
+        "simple_0.log.gz",
+        "simple_0.log",
+        "simple_0.log",
+        "simple_0.log.gz",
+        "simple_0.log.gz",
+    ]
+    assert merged[1][1][1] == "Traceback:\n"
+    assert source_names([first, first]) == [str(first), str(first)]
+
+
+@print_docstring()
+def test_merge_cli(tmp_path):
+    """Test tagging of merged text and JSON log files."""
+    text_path = tmp_path / "worker-a_1.log"
+    write_log(text_path, [30.0])
+    json_path = tmp_path / "worker-b_1.log"
+    with json_path.open("w") as logfile:
+        for stamp in ("2026-10-16T17:16:20+00:00", "2026-10-18T17:16:20"):
+            logfile.write(
+                json.dumps({"name": "simple", "time": stamp, "message": "m"})
+                + "\n"
+            )
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["merge", str(text_path), str(json_path), "-o", "-"]
+    )
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith('{"source":"worker-b_1.log","name":')
+    assert lines[1].startswith("worker-a_1.log | 2026-10-17 17:16:30.000")
+    assert json.loads(lines[2])["source"] == "worker-b_1.log"
+    merged_path = tmp_path / "merged.log.gz"
+    result = runner.invoke(
+        cli, ["merge", str(text_path), str(json_path), "-o", str(merged_path)]
+    )
+    assert result.exit_code == 0
+    with gzip.open(merged_path, "rt") as merged:
+        assert merged.read() == "\n".join(lines)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Test OpenMetrics export."""
+# module imports
+from click_loguru.metrics import format_metrics
+from click_loguru.metrics import write_metrics
+
+from .test_click_loguru import print_docstring
+
+
+@print_docstring()
+def test_format_and_write(tmp_path):
+    """Test label escaping, phase paths, and replacing a metrics file."""
+    timings = {
+        "name": "Total",
+        "wall": 2.5,
+        "cpu": 1.0,
+        "calls": 1,
+        "children": [
+            {"name": "Load", "wall": 2.0, "cpu": 0.5, "calls": 3,
+             "children": []},
+        ],
+    }
+    text = format_metrics({"name": 'say "hi"\\'}, timings, 1, 1000.0)
+    lines = text.split("\n")
+    assert lines[0] == "# TYPE click_loguru_phase_wall_seconds gauge"
+    assert (
+        'click_loguru_phase_calls{name="say \\"hi\\"\\\\",phase="Total/Load"} 3'
+        in lines
+    )
+    assert "peak_rss" not in text
+    assert text.endswith("\n# EOF\n")
+    metrics_path = tmp_path / "metrics" / "simple.prom"
+    write_metrics("old\n", metrics_path)
+    write_metrics(text, metrics_path)
+    assert metrics_path.read_text() == text
+    assert [p.name for p in metrics_path.parent.iterdir()] == ["simple.prom"]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Test click_loguru resource usage counters."""
+# module imports
+from click_loguru.resources import format_usage
+from click_loguru.resources import resource_usage
+from click_loguru.resources import usage_delta
+
+from .test_click_loguru import print_docstring
+
+
+@print_docstring()
+def test_usage_delta():
+    """Test that counters are differenced and max RSS is kept."""
+    start = resource_usage()
+    total = 0
+    for i in range(1000000):
+        total += i
+    end = resource_usage()
+    delta = usage_delta(start, end)
+    assert delta["user"] + delta["system"] > 0.0
+    assert delta["max_rss"] == end["max_rss"] > 0
+    assert all(value >= 0 for value in delta.values())
+    summary = format_usage(delta)
+    assert "user" in summary
+    assert "context switches" in summary
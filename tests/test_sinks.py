@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Test click_loguru log-file sinks."""
+# standard library imports
+import errno
+import gzip
+import json
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# third-party imports
+import pytest
+from loguru import logger
+
+# module imports
+from click_loguru.sinks import AsyncFileSink
+from click_loguru.sinks import BufferedFileSink
+from click_loguru.sinks import CompressedFileSink
+from click_loguru.sinks import JsonFormatter
+from click_loguru.sinks import JsonSink
+from click_loguru.sinks import RingBufferSink
+from click_loguru.sinks import open_logfile
+
+from .test_click_loguru import print_docstring
+
+
+@print_docstring()
+def test_async_sink_flushes_on_remove(tmp_path):
+    """Test that all queued messages are written when the sink stops."""
+    logfile_path = tmp_path / "logs" / "async.log"
+    sink = AsyncFileSink(logfile_path, queue_size=10)
+    handler_id = logger.add(sink, format="{message}", colorize=False)
+    for i in range(1000):
+        logger.debug(f"message {i}")
+    logger.remove(handler_id)
+    lines = logfile_path.read_text().split("\n")[:-1]
+    assert len(lines) == 1000
+    assert lines[-1] == "message 999"
+    assert sink.dropped == 0
+
+
+@print_docstring()
+def test_async_sink_drop_debug(tmp_path):
+    """Test that only DEBUG messages are dropped on overflow."""
+    logfile_path = tmp_path / "async.log"
+    sink = AsyncFileSink(logfile_path, queue_size=1, overflow="drop_debug")
+    handler_id = logger.add(sink, format="{message}", colorize=False)
+    for i in range(1000):
+        logger.debug(f"debug {i}")
+        logger.info(f"info {i}")
+    logger.remove(handler_id)
+    text = logfile_path.read_text()
+    assert text.count("info ") == 1000
+    assert text.count("debug ") == 1000 - sink.dropped
+
+
+class FailingFile:
+    """A log file on a full disk."""
+
+    closed = False
+
+    def write(self, text):
+        """Fail to write."""
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    def flush(self):
+        """Flush nothing."""
+
+    def close(self):
+        """Close."""
+        self.closed = True
+
+
+@print_docstring()
+def test_async_sink_write_error(tmp_path, capsys):
+    """Test that a failing file neither hangs logging nor exit."""
+    sink = AsyncFileSink(tmp_path / "async.log", queue_size=2)
+    failing_file = FailingFile()
+    sink._file.close()  # pylint: disable=protected-access
+    sink._file = failing_file  # pylint: disable=protected-access
+    handler_id = logger.add(sink, format="{message}", colorize=False)
+
+    def log_and_stop():
+        for i in range(100):
+            logger.info(f"message {i}")
+        logger.remove(handler_id)
+
+    thread = threading.Thread(target=log_and_stop, daemon=True)
+    thread.start()
+    thread.join(10.0)
+    assert not thread.is_alive()
+    assert sink.lost == 100
+    assert failing_file.closed
+    stderr = capsys.readouterr().err
+    assert "No space left on device" in stderr
+    assert "100 log messages lost" in stderr
+
+
+@print_docstring()
+def test_async_sink_bad_overflow(tmp_path):
+    """Test rejection of an unknown overflow policy."""
+    with pytest.raises(ValueError):
+        AsyncFileSink(tmp_path / "async.log", overflow="spill")
+
+
+@print_docstring()
+def test_json_formatter(tmp_path):
+    """Test one JSON object per line with static, phase, and extra fields."""
+    logfile_path = tmp_path / "structured.log"
+    formatter = JsonFormatter(
+        {"name": "simple", "subcommand": "levels"}, get_phase=lambda: "Load"
+    )
+    handler_id = logger.add(
+        JsonSink(open_logfile(logfile_path, buffering=1), formatter),
+        format="{message}",
+    )
+    other_records = []
+    other_id = logger.add(
+        lambda message: other_records.append(message.record["extra"])
+    )
+    logger.bind(sample="A1").info("info message")
+    try:
+        raise ValueError("bad value")
+    except ValueError:
+        logger.exception("failed")
+    logger.remove(handler_id)
+    logger.remove(other_id)
+    assert other_records == [{"sample": "A1"}, {}]
+    lines = logfile_path.read_text().split("\n")[:-1]
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record["name"] == "simple"
+    assert record["subcommand"] == "levels"
+    assert record["phase"] == "Load"
+    assert record["level"] == "INFO"
+    assert record["module"] == __name__
+    assert record["message"] == "info message"
+    assert record["sample"] == "A1"
+    record = json.loads(lines[1])
+    assert record["level"] == "ERROR"
+    assert "ValueError: bad value" in record["exception"]
+
+
+@print_docstring()
+def test_compressed_sink(tmp_path):
+    """Test writing a gzip-compressed log, synchronously and not."""
+    for sink_class in (CompressedFileSink, AsyncFileSink):
+        logfile_path = tmp_path / f"{sink_class.__name__}.log.gz"
+        if sink_class is AsyncFileSink:
+            sink = sink_class(logfile_path, compress=True)
+        else:
+            sink = sink_class(logfile_path)
+        handler_id = logger.add(sink, format="{message}", colorize=False)
+        for i in range(100):
+            logger.info(f"message {i}")
+        logger.remove(handler_id)
+        with gzip.open(logfile_path, "rt") as logfile:
+            lines = logfile.read().split("\n")[:-1]
+        assert lines == [f"message {i}" for i in range(100)]
+
+
+@print_docstring()
+def test_async_compressed_batches(tmp_path):
+    """Test that small batches do not end deflate blocks."""
+    sizes = {}
+    for sink_class in (CompressedFileSink, AsyncFileSink):
+        logfile_path = tmp_path / f"{sink_class.__name__}.log.gz"
+        if sink_class is AsyncFileSink:
+            sink = sink_class(logfile_path, compress=True)
+        else:
+            sink = sink_class(logfile_path)
+        handler_id = logger.add(sink, format="{message}", colorize=False)
+        for i in range(200):
+            logger.info(f"message {i}")
+            time.sleep(0.001)  # let the writer take one message per batch
+        logger.remove(handler_id)
+        sizes[sink_class] = logfile_path.stat().st_size
+    assert sizes[AsyncFileSink] < 1.2 * sizes[CompressedFileSink]
+
+
+@print_docstring()
+def test_ring_buffer_sink(tmp_path):
+    """Test that buffered DEBUG messages are written only before an ERROR."""
+    logfile_path = tmp_path / "ring.log"
+    sink = RingBufferSink(open_logfile(logfile_path, buffering=1), 3)
+    handler_id = logger.add(sink, format="{message}", colorize=False)
+    for i in range(5):
+        logger.debug(f"debug {i}")
+    logger.info("info")
+    assert logfile_path.read_text() == "info\n"
+    logger.error("error")
+    logger.debug("debug 5")
+    logger.remove(handler_id)
+    lines = logfile_path.read_text().split("\n")[:-1]
+    assert lines == ["info", "debug 2", "debug 3", "debug 4", "error"]
+
+
+@print_docstring()
+def test_buffered_sink_triggers(tmp_path):
+    """Test flushing by buffer size, level, interval, and stop."""
+    logfile_path = tmp_path / "logs" / "buffered.log"
+    sink = BufferedFileSink(logfile_path, buffer_size=20, flush_interval=0.2)
+    handler_id = logger.add(sink, format="{message}", colorize=False)
+    logger.debug("debug 0")
+    assert logfile_path.read_text() == ""
+    logger.debug("debug 1")
+    logger.debug("debug 2")
+    assert logfile_path.read_text() == "debug 0\ndebug 1\ndebug 2\n"
+    logger.debug("debug 3")
+    logger.warning("warning")
+    assert logfile_path.read_text().endswith("debug 3\nwarning\n")
+    logger.debug("debug 4")
+    time.sleep(0.5)
+    assert logfile_path.read_text().endswith("debug 4\n")
+    logger.debug("debug 5")
+    logger.remove(handler_id)
+    assert logfile_path.read_text().endswith("debug 5\n")
+
+
+SIGNAL_SCRIPT = """
+import os, signal, sys
+from loguru import logger
+from click_loguru.sinks import BufferedFileSink
+logger.add(BufferedFileSink(sys.argv[1], flush_interval=60), format="{message}")
+logger.debug("before signal")
+os.kill(os.getpid(), signal.SIGTERM)
+"""
+
+
+@print_docstring()
+def test_buffered_sink_signal(tmp_path):
+    """Test that buffered messages are written before a SIGTERM kills us."""
+    logfile_path = tmp_path / "signal.log"
+    result = subprocess.run(
+        [sys.executable, "-c", SIGNAL_SCRIPT, str(logfile_path)],
+        cwd=Path(__file__).resolve().parent.parent,
+        check=False,
+    )
+    assert result.returncode == -signal.SIGTERM
+    assert logfile_path.read_text() == "before signal\n"
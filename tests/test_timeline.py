@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Test memory timelines."""
+# third-party imports
+from click.testing import CliRunner
+
+# module imports
+from click_loguru.memory import MEGABYTE
+from click_loguru.timeline import MemoryTimeline
+from click_loguru.timeline import main
+from click_loguru.timeline import read_timeline
+
+from .test_click_loguru import print_docstring
+
+
+@print_docstring()
+def test_timeline_round_trip(tmp_path):
+    """Test that only changed samples are kept, with phase markers."""
+    timeline_path = tmp_path / "logs" / "run_0.memtl"
+    timeline = MemoryTimeline(timeline_path, max_interval=60.0)
+    timeline.mark("Load")
+    for rss in (10, 10, 10, 20, 20, 1000):
+        timeline.sample(rss * MEGABYTE)
+    timeline.mark("Écrire")
+    timeline.sample(1001 * MEGABYTE)
+    timeline.mark(None)
+    timeline.close(5 * MEGABYTE)
+    unused_start, samples, markers = read_timeline(timeline_path)
+    assert [rss // MEGABYTE for unused_time, rss in samples] == [
+        10,
+        20,
+        1000,
+        5,
+    ]
+    assert [name for unused_time, name in markers] == [
+        "Load",
+        "Écrire",
+        None,
+    ]
+    runner = CliRunner()
+    result = runner.invoke(main, [str(timeline_path), "--width", "10"])
+    assert result.exit_code == 0
+    lines = result.output.split("\n")
+    assert lines[0].startswith("peak 1000.0 MB")
+    assert len(lines[1]) == 10
+    assert lines[3].startswith("1 ") and lines[3].endswith(" Load")
+    result = runner.invoke(main, [str(timeline_path), "--csv"])
+    assert result.exit_code == 0
+    rows = result.output.split("\n")
+    assert rows[0] == "seconds,rss_bytes,phase"
+    assert rows[3].endswith(f",{1000 * MEGABYTE},Load")
+    assert rows[4].endswith(",")
+
+
+@print_docstring()
+def test_not_a_timeline(tmp_path):
+    """Test rejection of a file that is not a timeline."""
+    bad_path = tmp_path / "bad.memtl"
+    bad_path.write_bytes(b"not a timeline at all")
+    result = CliRunner().invoke(main, [str(bad_path)])
+    assert result.exit_code == 1
+    assert "not a memory timeline" in result.output
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Test hierarchical timers."""
+# standard library imports
+import asyncio
+import json
+import random
+import timeit
+from time import sleep
+
+# module imports
+from click_loguru.timers import HotTimer
+from click_loguru.timers import PhaseTimer
+from click_loguru.timers import TimerTree
+
+from .test_click_loguru import print_docstring
+
+# global constants
+MAX_HOT_TIMER_OVERHEAD = 5e-6  # seconds per decorated call
+
+
+@print_docstring()
+def test_timer_tree_dict():
+    """Test nesting, call counts, and dict output of a timing tree."""
+    tree = TimerTree()
+    inner = PhaseTimer(tree, "inner")
+
+    @inner
+    def work():
+        sleep(0.01)
+
+    with PhaseTimer(tree, "outer"):
+        work()
+        work()
+    timings = json.loads(json.dumps(tree.as_dict()))
+    assert timings["name"] == "Total"
+    outer = timings["children"][0]
+    assert outer["name"] == "outer"
+    assert outer["calls"] == 1
+    assert outer["children"][0]["calls"] == 2
+    assert outer["children"][0]["wall"] >= 0.02
+    assert timings["wall"] >= outer["wall"] >= outer["children"][0]["wall"]
+
+
+@print_docstring()
+def test_stop_closes_inner_timers():
+    """Test that stopping an outer timer stops timers left running in it."""
+    tree = TimerTree()
+    outer = tree.start("outer")
+    tree.start("inner")
+    tree.stop(outer)
+    node = tree.root.children["outer"]
+    assert node.calls == 1
+    assert node.children["inner"].calls == 1
+    assert tree.start("next") is not None
+    assert "next" in tree.root.children
+
+
+@print_docstring()
+def test_timers_in_tasks():
+    """Test that concurrent tasks nest their own timers in one tree."""
+    tree = TimerTree()
+
+    async def stage(name):
+        with PhaseTimer(tree, name):
+            await asyncio.sleep(0.05)
+            with PhaseTimer(tree, "io"):
+                await asyncio.sleep(0.05)
+
+    async def pipeline():
+        with PhaseTimer(tree, "run"):
+            await asyncio.gather(stage("read"), stage("write"))
+
+    asyncio.run(pipeline())
+    run = tree.root.children["run"]
+    assert run.calls == 1
+    assert list(run.children) == ["read", "write"]
+    for node in run.children.values():
+        assert node.calls == 1
+        assert 0.1 <= node.wall < run.wall
+        assert list(node.children) == ["io"]
+        assert node.children["io"].wall >= 0.05
+
+
+@print_docstring()
+def test_hot_timer_percentiles():
+    """Test hot-timer statistics against exact values."""
+    hot_timer = HotTimer("uniform")
+    durations = list(range(1000, 101000, 10))
+    random.shuffle(durations)
+    for duration in durations:
+        hot_timer.record(duration)
+    stats = hot_timer.as_dict()
+    durations.sort()
+    assert stats["count"] == len(durations)
+    assert stats["min"] == durations[0]
+    assert stats["max"] == durations[-1]
+    assert stats["total"] == sum(durations)
+    for percent in (50, 95, 99):
+        exact = durations[int(percent * len(durations) / 100) - 1]
+        assert abs(stats[f"p{percent}"] - exact) / exact < 0.02
+
+
+@print_docstring()
+def test_hot_timer_overhead():
+    """Test that a decorated call costs only a few microseconds."""
+    hot_timer = HotTimer("noop")
+
+    @hot_timer
+    def noop():
+        pass
+
+    n_calls = 100000
+    elapsed = timeit.timeit(noop, number=n_calls) / n_calls
+    assert hot_timer.count == n_calls
+    assert elapsed < MAX_HOT_TIMER_OVERHEAD